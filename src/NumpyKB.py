@@ -0,0 +1,413 @@
+import numpy as np
+from areaData import computeNearAreas, getSeverities, AreaDistances, filterEvaluable
+from modelRegistry import loadModel
+
+
+class NumpyKB:
+    """
+    Classe che rappresenta la base di conoscenza con array NumPy, senza usare prolog.
+    Fornisce gli stessi metodi della classe KB e ne replica la semantica delle regole di kb.pl:
+    la gravità corretta di un'area con gravità al massimo 1 e dimensione maggiore della media tra dimensione minima e massima
+    aumenta di 1, un'area è sicura se c'è una pattuglia entro la distanza 2 - gravità corretta ed è valutabile se tutte le aree
+    entro quella distanza sono state assegnate
+
+    Attributi:
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+        modelPath (String): Il percorso del modello di machine learning addestrato per la previsione della gravità dei crimini
+        week (Int): la settimana in cui si vuole effettuare la previsione
+        day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+        timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+    """
+
+    def __init__(self, areasGdf, modelPath, week, day, timeslot, severities=None):
+        """
+        Costruttore della classe. Inizializza la base di conoscenza
+
+        Parametri:
+            areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+            modelPath (String): Il percorso del modello di machine learning addestrato per la previsione della gravità dei crimini
+            week (Int): la settimana in cui si vuole effettuare la previsione
+            day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+            timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+            severities (Dict): la gravità iniziale di ogni area. Se specificata il modello non viene usato e modelPath può essere None
+        """
+
+        self.areasGdf = areasGdf
+        self.modelPath = modelPath
+        self.week = week
+        self.day = day
+        self.timeslot = timeslot
+        self.model = None
+        self.patrolState = {}
+        self.initializaKB(severities)
+
+
+    def getConfig(self):
+        """
+        Metodo che restituisce i parametri con cui è stata costruita la base di conoscenza, per poterne costruire una equivalente
+
+        Returns:
+            Tuple: i parametri del costruttore (areasGdf, modelPath, week, day, timeslot, severities).
+                La gravità corrente viene restituita solo se la base di conoscenza non usa un modello
+        """
+
+        return (self.areasGdf, self.modelPath, self.week, self.day, self.timeslot, self.severities if self.modelPath is None else None)
+
+
+    def close(self):
+        """
+        Metodo presente per compatibilità con la classe KB: la base di conoscenza non usa risorse esterne, vengono solo rimosse le assegnazioni
+        """
+
+        self.clearPatrols()
+
+
+    def initializaKB(self, severities=None):
+        """
+        Metodo che inizializza la base di conoscenza: aree, vicinanze, matrice delle distanze, dimensioni e gravità
+
+        Parametri:
+            severities (Dict): la gravità iniziale di ogni area. Se None viene usata quella prevista dal modello
+        """
+
+        self.areas = [int(area.AreaNumber) for area in self.areasGdf.itertuples()]
+        self.nearAreas = {int(area): [int(a) for a in near] for area, near in computeNearAreas(self.areasGdf).items()}
+        self.areaDistances = AreaDistances(self.areas, self.nearAreas)
+        self.areaIndex = self.areaDistances.areaIndex
+        self.distances = self.areaDistances.matrix
+        self.sizes = {int(area.AreaNumber): float(area.AreaSize) for area in self.areasGdf.itertuples()}
+        self.sizeArray = np.array([self.sizes[area] for area in self.areas])
+        if severities is None:
+            self.defineAreaSeverities()
+        else:
+            self.setSeverities(severities)
+
+
+    def setSlot(self, week, day, timeslot):
+        """
+        Metodo che cambia la settimana, il giorno e la fascia oraria della base di conoscenza, ricalcolando solo le gravità
+
+        Parametri:
+            week (Int): la settimana in cui si vuole effettuare la previsione
+            day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+            timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+        """
+
+        if self.modelPath is None:
+            raise ValueError("La base di conoscenza non usa un modello: la gravità può essere cambiata solo con setSeverities")
+        self.week = week
+        self.day = day
+        self.timeslot = timeslot
+        self.defineAreaSeverities()
+
+
+    def getModel(self):
+        """
+        Metodo che restituisce il modello di apprendimento, caricandolo alla prima richiesta attraverso il registro dei modelli
+
+        Returns:
+            Pipeline: il modello di apprendimento
+        """
+
+        if self.model is None:
+            self.model = loadModel(self.modelPath)
+        return self.model
+
+
+    def defineAreaSeverities(self):
+        """
+        Metodo che legge la gravità delle aree prevista dal modello di apprendimento e calcola la gravità corretta in base alla dimensione
+        e la matrice dei vicinati (aree entro la distanza 2 - gravità corretta)
+        """
+
+        severities = getSeverities(self.modelPath, self.areasGdf, self.week, self.day, self.timeslot, self.getModel)
+        self.setSeverities(severities)
+
+
+    def setSeverities(self, severities):
+        """
+        Metodo che imposta la gravità delle aree e ricalcola i valori che ne dipendono. Vengono rimosse anche le assegnazioni delle aree
+
+        Parametri:
+            severities (Dict): la gravità di ogni area
+        """
+
+        self.severities = {int(area): int(severity) for area, severity in severities.items()}
+        severityArray = np.array([self.severities[area] for area in self.areas])
+        middle = (self.sizeArray.min() + self.sizeArray.max()) / 2
+        adjusted = np.where((severityArray <= 1) & (self.sizeArray > middle), severityArray + 1, severityArray)
+        self.adjustedSeverities = {area: int(adjusted[i]) for i, area in enumerate(self.areas)}
+        radius = 2 - adjusted
+        self.balls = (self.distances >= 0) & (self.distances <= radius[:, None])
+        self.clearPatrols()
+
+
+    def setAreaPatrol(self, areaNum, patrol):
+        """
+        Metodo che imposta l'area come assegnata, pattugliata o no
+
+        Parametri:
+            areaNum (Int): il numero dell'area da impostare come pattugliata
+            patrol (Bool): True se l'area è pattugliata, False altrimenti
+        """
+
+        i = self.areaIndex[areaNum]
+        self.assigned[i] = True
+        self.patrolled[i] = patrol
+        self.patrolState[areaNum] = patrol
+
+
+    def removeAreaPatrol(self, areaNum):
+        """
+        Metodo che rimuove l'assegnazione dell'area
+
+        Parametri:
+            areaNum (Int): il numero dell'area da rimuovere dalla lista delle aree pattugliate
+        """
+
+        i = self.areaIndex[areaNum]
+        self.assigned[i] = False
+        self.patrolled[i] = False
+        self.patrolState.pop(areaNum, None)
+
+
+    def clearPatrols(self):
+        """
+        Metodo che rimuove tutte le assegnazioni delle aree
+        """
+
+        self.assigned = np.zeros(len(self.areas), dtype=bool)
+        self.patrolled = np.zeros(len(self.areas), dtype=bool)
+        self.patrolState = {}
+
+
+    def isAreaSafe(self, areaNum):
+        """
+        Metodo che verifica se l'area specificata è sicura
+
+        Parametri:
+            areaNum (Int): il numero dell'area da verificare
+
+        Returns:
+            List: una lista non vuota se l'area è sicura, vuota altrimenti (come il risultato della query isSafe in KB)
+        """
+
+        return [{}] if (self.balls[self.areaIndex[areaNum]] & self.patrolled).any() else []
+
+
+    def isAreaConsiderable(self, areaNum):
+        """
+        Metodo che verifica se l'area specificata è valutabile, cioè se tutte le aree entro la sua distanza massima sono assegnate
+
+        Parametri:
+            areaNum (Int): il numero dell'area da verificare
+
+        Returns:
+            Bool: True se l'area è valutabile, False altrimenti
+        """
+
+        return not (self.balls[self.areaIndex[areaNum]] & ~self.assigned).any()
+
+
+    def getSafeAreas(self, areas=None):
+        """
+        Metodo che restituisce le aree sicure con lo stato corrente delle pattuglie
+
+        Parametri:
+            areas (Iterable): le aree da verificare. Se None vengono verificate tutte le aree
+
+        Returns:
+            Set: l'insieme delle aree sicure
+        """
+
+        areas = self.areas if areas is None else list(areas)
+        rows = self.balls[[self.areaIndex[area] for area in areas]]
+        safe = (rows & self.patrolled).any(axis=1)
+        return {area for area, s in zip(areas, safe) if s}
+
+
+    def getConsiderableAreas(self, areas=None):
+        """
+        Metodo che restituisce le aree valutabili con lo stato corrente delle pattuglie
+
+        Parametri:
+            areas (Iterable): le aree da verificare. Se None vengono verificate tutte le aree
+
+        Returns:
+            Set: l'insieme delle aree valutabili
+        """
+
+        areas = self.areas if areas is None else list(areas)
+        rows = self.balls[[self.areaIndex[area] for area in areas]]
+        considerable = ~(rows & ~self.assigned).any(axis=1)
+        return {area for area, c in zip(areas, considerable) if c}
+
+
+    def getAreasList(self):
+        """
+        Metodo che restituisce la lista delle aree di Chicago
+
+        Returns:
+            List: la lista delle aree di Chicago
+        """
+
+        return list(self.areas)
+
+
+    def getAreasByDistance(self, areaNum, distance):
+        """
+        Metodo che restituisce la lista delle aree di Chicago a una distanza specificata dall'area specificata
+
+        Parametri:
+            areaNum (Int): il numero dell'area di partenza
+            distance (Int): la distanza dall'area di partenza
+
+        Returns:
+            List: la lista delle aree a distanza distance dall'area specificata
+        """
+
+        return self.areaDistances.byDistance(areaNum, distance)
+
+
+    def getAreasWithinDistance(self, areaNum, distance):
+        """
+        Metodo che restituisce la lista delle aree di Chicago a una distanza minore o uguale a quella specificata dall'area specificata
+
+        Parametri:
+            areaNum (Int): il numero dell'area di partenza
+            distance (Int): la distanza massima dall'area di partenza
+
+        Returns:
+            List: la lista delle aree entro la distanza distance dall'area specificata (compresa l'area stessa)
+        """
+
+        return self.areaDistances.within(areaNum, distance)
+
+
+    def getAllAreasByDistance(self, distance):
+        """
+        Metodo che restituisce, per ogni area, le aree alla distanza specificata
+
+        Parametri:
+            distance (Int): la distanza
+
+        Returns:
+            Dict: l'insieme delle aree a distanza distance da ogni area
+        """
+
+        return {area: set(self.getAreasByDistance(area, distance)) for area in self.areas}
+
+
+    def getDistance(self, areaNum1, areaNum2):
+        """
+        Metodo che restituisce la distanza tra due aree
+
+        Parametri:
+            areaNum1 (Int): il numero della prima area
+            areaNum2 (Int): il numero della seconda area
+
+        Returns:
+            Int: la distanza tra le due aree, -1 se non sono collegate
+        """
+
+        return self.areaDistances.distance(areaNum1, areaNum2)
+
+
+    def getAreaSeverity(self, areaNum):
+        """
+        Metodo che restituisce la gravità dei crimini dell'area specificata
+
+        Parametri:
+            areaNum (Int): il numero dell'area
+
+        Returns:
+            Int: la gravità dei crimini dell'area specificata
+        """
+
+        return self.severities[areaNum]
+
+
+    def getAreaAdjustedSeverity(self, areaNum):
+        """
+        Metodo che restituisce la gravità dell'area specificata corretta in base alla sua dimensione
+
+        Parametri:
+            areaNum (Int): il numero dell'area
+
+        Returns:
+            Int: la gravità corretta dell'area specificata
+        """
+
+        return self.adjustedSeverities[areaNum]
+
+
+    def getAreaSize(self, areaNum):
+        """
+        Metodo che restituisce la dimensione dell'area specificata
+
+        Parametri:
+            areaNum (Int): il numero dell'area
+
+        Returns:
+            Float: la dimensione dell'area specificata
+        """
+
+        return self.sizes[areaNum]
+
+
+    def getAllSeverities(self):
+        """
+        Metodo che restituisce la gravità di tutte le aree
+
+        Returns:
+            Dict: la gravità di ogni area
+        """
+
+        return dict(self.severities)
+
+
+    def getAllAdjustedSeverities(self):
+        """
+        Metodo che restituisce la gravità corretta di tutte le aree
+
+        Returns:
+            Dict: la gravità corretta di ogni area
+        """
+
+        return dict(self.adjustedSeverities)
+
+
+    def getAllSizes(self):
+        """
+        Metodo che restituisce la dimensione di tutte le aree
+
+        Returns:
+            Dict: la dimensione di ogni area
+        """
+
+        return dict(self.sizes)
+
+
+    def getAllNearAreas(self):
+        """
+        Metodo che restituisce le aree vicine di tutte le aree
+
+        Returns:
+            Dict: la lista delle aree vicine di ogni area
+        """
+
+        return {area: list(near) for area, near in self.nearAreas.items()}
+
+
+    def evaluableAreas(self, areas):
+        """
+        Metodo che restituisce la lista delle aree valutabili
+
+        Parametri:
+            areas (List): la lista delle aree da cui selezionare le aree valutabili
+
+        Returns:
+            List: la lista delle aree valutabili
+        """
+
+        return filterEvaluable(areas, self.getConsiderableAreas())
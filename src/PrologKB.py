@@ -1,14 +1,15 @@
 from pyswip import Prolog
-from shapely.geometry import MultiPolygon
-import pandas as pd
-import joblib
+import itertools
+from areaData import computeNearAreas, getSeverities, AreaDistances, filterEvaluable
+from modelRegistry import loadModel
 from util import removeDuplicates, getBasePath
 import os
 
 
 class KB:
     """
-    Classe che rappresenta la base di conoscenza in prolog e fornisce i metodi per manipolarla e interrogarla
+    Classe che rappresenta la base di conoscenza in prolog e fornisce i metodi per manipolarla e interrogarla.
+    Ogni istanza carica kb.pl e i propri fatti in un modulo prolog separato, quindi più istanze possono convivere nello stesso processo
 
     Attributi:
         areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
@@ -16,9 +17,13 @@ class KB:
         week (Int): la settimana in cui si vuole effettuare la previsione
         day (Int): il giorno della settimana in cui si vuole effettuare la previsione
         timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+        compiled (Bool): se True i valori derivati che non cambiano durante la ricerca (gravità corretta) vengono materializzati come fatti
     """
     
-    def __init__(self, areasGdf, modelPath, week, day, timeslot):
+    # Contatore usato per assegnare a ogni istanza un modulo prolog diverso
+    instances = itertools.count()
+
+    def __init__(self, areasGdf, modelPath, week, day, timeslot, compiled=True, severities=None):
         """
         Costruttore della classe. Inizializza la base di conoscenza in prolog
 
@@ -28,32 +33,113 @@ class KB:
             week (Int): la settimana in cui si vuole effettuare la previsione
             day (Int): il giorno della settimana in cui si vuole effettuare la previsione
             timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+            compiled (Bool): se True i valori derivati che non cambiano durante la ricerca (gravità corretta) vengono materializzati come fatti
+            severities (Dict): la gravità iniziale di ogni area. Se specificata il modello non viene usato e modelPath può essere None
         """
 
+        # Il motore prolog di pyswip è unico per processo: ogni istanza usa un proprio modulo, così i fatti di istanze diverse non si mescolano
         self.prolog = Prolog()
+        self.module = f"kb_{next(KB.instances)}"
         self.areasGdf = areasGdf
         self.modelPath = modelPath
         self.week = week
         self.day = day
         self.timeslot = timeslot
-        self.initializaKB()
+        self.compiled = compiled
+        # Modello di apprendimento, caricato alla prima previsione
+        self.model = None
+        # Stato corrente dei fatti patrolArea presenti in prolog (area -> pattugliata)
+        self.patrolState = {}
+        self.initializaKB(severities)
     
 
-    def initializaKB(self):
+    def getConfig(self):
+        """
+        Metodo che restituisce i parametri con cui è stata costruita la base di conoscenza, per poterne costruire una equivalente
+        (ad esempio in un altro processo)
+
+        Returns:
+            Tuple: i parametri del costruttore (areasGdf, modelPath, week, day, timeslot, compiled, severities).
+                La gravità corrente viene restituita solo se la base di conoscenza non usa un modello
+        """
+
+        return (self.areasGdf, self.modelPath, self.week, self.day, self.timeslot, self.compiled,
+                self.severities if self.modelPath is None else None)
+
+
+    def query(self, goal, maxresult=-1):
+        """
+        Metodo che esegue una query nel modulo prolog dell'istanza
+
+        Parametri:
+            goal (String): l'obiettivo da dimostrare
+            maxresult (Int): il numero massimo di soluzioni da restituire, -1 per tutte
+
+        Returns:
+            Generator: le soluzioni trovate
+        """
+
+        return self.prolog.query(f"{self.module}:({goal})", maxresult=maxresult)
+
+
+    def assertz(self, fact):
+        """
+        Metodo che aggiunge un fatto al modulo prolog dell'istanza
+
+        Parametri:
+            fact (String): il fatto da aggiungere
+        """
+
+        self.prolog.assertz(f"{self.module}:({fact})")
+
+
+    def retract(self, fact):
+        """
+        Metodo che rimuove un fatto dal modulo prolog dell'istanza
+
+        Parametri:
+            fact (String): il fatto da rimuovere
+        """
+
+        self.prolog.retract(f"{self.module}:({fact})")
+
+
+    def close(self):
+        """
+        Metodo che rimuove dal motore prolog le regole e i fatti dell'istanza. Dopo la chiamata l'istanza non può più essere usata
+        """
+
+        for fact in ["area(_)", "severity(_, _)", "nearAreas(_, _)", "size(_, _)", "hopDistance(_, _, _)", "patrolArea(_, _)",
+                     "compiledKB", "compiledAdjustedSeverity(_, _)"]:
+            list(self.query(f"retractall({fact})"))
+        list(self.prolog.query(f"catch(unload_file('{self.module}'), _, true)"))
+        self.patrolState = {}
+
+
+    def initializaKB(self, severities=None):
         """
         Metodo che inizializza la base di conoscenza in prolog
+
+        Parametri:
+            severities (Dict): la gravità iniziale di ogni area. Se None viene usata quella prevista dal modello
         """
 
         kb = str(os.path.join(getBasePath(), "src", "kb.pl")).replace("\\", "/")
-        self.prolog.consult(kb)
+        # Un file senza dichiarazione di modulo può essere consultato in un solo modulo: viene quindi caricato da uno stream,
+        # con un identificativo diverso per ogni istanza
+        list(self.prolog.query(f"open('{kb}', read, S), load_files({self.module}:'{self.module}', [stream(S)]), close(S)"))
         # Definizione dei fatti area per le aree di Chicago
         self.defineAreas()
         # Definizione dei fatti nearAreas per le aree vicine
         self.defineNearAreas()
         # Definizione dei fatti relativi alla gravità delle aree
-        self.defineAreaSeverities()
+        self.defineAreaSeverities(severities)
         # Definizione dei fatti relativi alle dimensioni delle aree
         self.defineAreasSize()
+        # Materializzazione dei valori derivati
+        self.compileKB()
+        # Caricamento in memoria dei fatti statici usati durante la ricerca
+        self.cacheFacts()
 
     
     def defineAreas(self):
@@ -62,7 +148,7 @@ class KB:
         """
 
         for area in self.areasGdf.itertuples():
-            self.prolog.assertz(f"area({area.AreaNumber})")
+            self.assertz(f"area({area.AreaNumber})")
 
 
     def defineNearAreas(self):
@@ -71,38 +157,72 @@ class KB:
         Due aree sono considerate vicine se hanno due punti del loro perimetro in comune
         """
 
-        i = 0
-        y = 0
-        for area1 in self.areasGdf.itertuples():
-            perimeter1 = MultiPolygon(area1.Perimeter)
-            y = 0
-            list = []
-            for area2 in self.areasGdf.itertuples():
-                if i != y:
-                    perimeter2 = MultiPolygon(area2.Perimeter)
-                    if perimeter1.touches(perimeter2):
-                        list.append(area2.AreaNumber)
-                y += 1
-            self.prolog.assertz(f"nearAreas(area({area1.AreaNumber}), {list})")
-            i += 1
+        for area, nearAreas in computeNearAreas(self.areasGdf).items():
+            self.assertz(f"nearAreas(area({area}), {nearAreas})")
+
+
+    def setSlot(self, week, day, timeslot):
+        """
+        Metodo che cambia la settimana, il giorno e la fascia oraria della base di conoscenza.
+        Vengono sostituiti solo i fatti severity (e rimossi i fatti patrolArea), mentre aree, vicinanze e dimensioni restano invariate
+
+        Parametri:
+            week (Int): la settimana in cui si vuole effettuare la previsione
+            day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+            timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+        """
+
+        if self.modelPath is None:
+            raise ValueError("La base di conoscenza non usa un modello: la gravità può essere cambiata solo con setSeverities")
+        self.week = week
+        self.day = day
+        self.timeslot = timeslot
+        self.setSeverities(getSeverities(self.modelPath, self.areasGdf, self.week, self.day, self.timeslot, self.getModel))
+
+
+    def setSeverities(self, severities):
+        """
+        Metodo che sostituisce i fatti severity con la gravità specificata e aggiorna i fatti e la cache che ne dipendono.
+        Vengono rimossi anche i fatti patrolArea
+
+        Parametri:
+            severities (Dict): la gravità di ogni area
+        """
+
+        self.clearPatrols()
+        list(self.query("retractall(severity(_, _))"))
+        for area, severity in severities.items():
+            self.assertz(f"severity(area({area}), {severity})")
+        self.compileKB()
+        self.cacheSeverities()
+
+
+    def getModel(self):
+        """
+        Metodo che restituisce il modello di apprendimento, caricandolo alla prima richiesta attraverso il registro dei modelli
+
+        Returns:
+            Pipeline: il modello di apprendimento
+        """
+
+        if self.model is None:
+            self.model = loadModel(self.modelPath)
+        return self.model
 
 
-    def defineAreaSeverities(self):
+    def defineAreaSeverities(self, severities=None):
         """
         Metodo che definisce i fatti areaSeverity per le aree di Chicago, della forma severity(area(A), Sev).
-        La gravità dei crimini è prevista utilizzando il modello di machine learning addestrato
+        La gravità dei crimini è letta dal tensore delle gravità previste dal modello di machine learning addestrato
+
+        Parametri:
+            severities (Dict): la gravità di ogni area. Se None viene usata quella prevista dal modello
         """
 
-        loadedModel = joblib.load(self.modelPath)
-        for area in self.areasGdf.itertuples():
-            data = {
-                'Week': self.week,
-                'Day': self.day,
-                'Time Slot': self.timeslot,
-                'Community Area': area.AreaNumber
-            }
-            prediction = loadedModel.predict(pd.DataFrame(data, index=[0]))
-            self.prolog.assertz(f"severity(area({area.AreaNumber}), {int(prediction[0])})")
+        if severities is None:
+            severities = getSeverities(self.modelPath, self.areasGdf, self.week, self.day, self.timeslot, self.getModel)
+        for area, severity in severities.items():
+            self.assertz(f"severity(area({area}), {severity})")
 
 
     def defineAreasSize(self):
@@ -112,7 +232,200 @@ class KB:
         """
 
         for area in self.areasGdf.itertuples():
-            self.prolog.assertz(f"size(area({area.AreaNumber}), {area.AreaSize})")
+            self.assertz(f"size(area({area.AreaNumber}), {area.AreaSize})")
+
+
+    def compileKB(self):
+        """
+        Metodo che, nella modalità compilata, materializza la gravità corretta di ogni area come fatto compiledAdjustedSeverity(A, Sev),
+        così le regole isSafe e isConsiderable non ricalcolano dimensione minima e massima delle aree ad ogni chiamata.
+        Va richiamato ogni volta che cambiano i fatti severity o size
+        """
+
+        if self.compiled:
+            list(self.query("compileKB"))
+
+
+    def cacheFacts(self):
+        """
+        Metodo che carica in memoria i fatti statici della base di conoscenza (aree, gravità, gravità corretta, dimensioni e aree vicine).
+        I fatti non cambiano durante la ricerca, quindi vengono letti da prolog una sola volta e i metodi di interrogazione
+        li restituiscono senza eseguire altre query
+        """
+
+        self.areas = removeDuplicates(self.findall("A", "area(A)"))
+        self.sizes = self.getAllSizes()
+        self.nearAreas = self.getAllNearAreas()
+        self.defineDistances()
+        self.cacheSeverities()
+
+
+    def defineDistances(self):
+        """
+        Metodo che calcola la matrice delle distanze tra tutte le coppie di aree sul grafo delle vicinanze e definisce i fatti
+        hopDistance della forma hopDistance(A1, A2, D), usati dalla regola distance/3.
+        La matrice è indicizzata secondo self.areaIndex e contiene -1 per le coppie di aree non collegate
+        """
+
+        self.areaDistances = AreaDistances(self.areas, self.nearAreas)
+        self.areaIndex = self.areaDistances.areaIndex
+        self.distances = self.areaDistances.matrix
+
+        list(self.query("retractall(hopDistance(_, _, _))"))
+        for i, area1 in enumerate(self.areas):
+            for j, area2 in enumerate(self.areas):
+                if self.distances[i, j] >= 0:
+                    self.assertz(f"hopDistance({area1}, {area2}, {self.distances[i, j]})")
+
+
+    def cacheSeverities(self):
+        """
+        Metodo che carica in memoria i fatti che dipendono dalla fascia oraria: gravità e gravità corretta delle aree
+        """
+
+        self.severities = self.getAllSeverities()
+        self.adjustedSeverities = self.getAllAdjustedSeverities()
+
+
+    def findall(self, template, goal):
+        """
+        Metodo che esegue una query findall(template, goal, L) e restituisce la lista L, attraversando l'interfaccia con prolog una sola volta
+
+        Parametri:
+            template (String): il termine da raccogliere per ogni soluzione
+            goal (String): l'obiettivo da dimostrare
+
+        Returns:
+            List: la lista dei termini raccolti
+        """
+
+        res = list(self.prolog.query(f"findall({template}, {self.module}:({goal}), L)"))
+        return list(res[0]['L'])
+
+
+    def areasTerm(self, areas):
+        """
+        Metodo che restituisce la lista prolog corrispondente a una collezione di numeri di aree
+
+        Parametri:
+            areas (Iterable): i numeri delle aree
+
+        Returns:
+            String: la lista prolog delle aree
+        """
+
+        return "[" + ", ".join(str(area) for area in areas) + "]"
+
+
+    def getAllSeverities(self):
+        """
+        Metodo che restituisce la gravità di tutte le aree con una sola query
+
+        Returns:
+            Dict: la gravità di ogni area
+        """
+
+        return {a: sev for a, sev in self.findall("[A, S]", "severity(area(A), S)")}
+
+
+    def getAllAdjustedSeverities(self):
+        """
+        Metodo che restituisce la gravità corretta di tutte le aree con una sola query
+
+        Returns:
+            Dict: la gravità corretta di ogni area
+        """
+
+        return {a: sev for a, sev in self.findall("[A, S]", "adjustedSeverity(area(A), S)")}
+
+
+    def getAllSizes(self):
+        """
+        Metodo che restituisce la dimensione di tutte le aree con una sola query
+
+        Returns:
+            Dict: la dimensione di ogni area
+        """
+
+        return {a: size for a, size in self.findall("[A, S]", "size(area(A), S)")}
+
+
+    def getAllNearAreas(self):
+        """
+        Metodo che restituisce le aree vicine di tutte le aree con una sola query
+
+        Returns:
+            Dict: la lista delle aree vicine di ogni area
+        """
+
+        return {a: list(near) for a, near in self.findall("[A, L]", "nearAreas(area(A), L)")}
+
+
+    def getAllAreasByDistance(self, distance):
+        """
+        Metodo che restituisce, per ogni area, le aree alla distanza specificata con una sola query
+
+        Parametri:
+            distance (Int): la distanza
+
+        Returns:
+            Dict: l'insieme delle aree a distanza distance da ogni area
+        """
+
+        res = {area: set() for area in self.areas}
+        for a, b in self.findall("[A, B]", f"distance(area(A), area(B), {distance})"):
+            res[a].add(b)
+        return res
+
+
+    def getReferenceAreasByDistance(self, distance):
+        """
+        Metodo che restituisce, per ogni area, le aree alla distanza specificata (al massimo 2) ricavate dalla regola di riferimento
+        nearDistance/3, che attraversa direttamente i fatti nearAreas senza usare la matrice delle distanze
+
+        Parametri:
+            distance (Int): la distanza, tra 0 e 2
+
+        Returns:
+            Dict: l'insieme delle aree a distanza distance da ogni area
+        """
+
+        res = {area: set() for area in self.areas}
+        for a, b in self.findall("[A, B]", f"nearDistance(area(A), area(B), {distance})"):
+            res[a].add(b)
+        return res
+
+
+    def getSafeAreas(self, areas=None):
+        """
+        Metodo che restituisce le aree sicure con lo stato corrente delle pattuglie, con una sola query
+
+        Parametri:
+            areas (Iterable): le aree da verificare. Se None vengono verificate tutte le aree
+
+        Returns:
+            Set: l'insieme delle aree sicure
+        """
+
+        if areas is None:
+            return set(self.findall("A", "area(A), isSafe(area(A))"))
+        return set(self.findall("A", f"member(A, {self.areasTerm(areas)}), isSafe(area(A))"))
+
+
+    def getConsiderableAreas(self, areas=None):
+        """
+        Metodo che restituisce le aree valutabili con lo stato corrente delle pattuglie, con una sola query
+
+        Parametri:
+            areas (Iterable): le aree da verificare. Se None vengono verificate tutte le aree
+
+        Returns:
+            Set: l'insieme delle aree valutabili
+        """
+
+        if areas is None:
+            return set(self.findall("A", "area(A), isConsiderable(area(A))"))
+        return set(self.findall("A", f"member(A, {self.areasTerm(areas)}), isConsiderable(area(A))"))
 
 
     def setAreaPatrol(self, areaNum, patrol):
@@ -126,10 +439,12 @@ class KB:
         """
 
         # controllo se esiste già un fatto patrolArea per l'area specificata
-        res = list(self.prolog.query(f"patrolArea(area({areaNum}), _)"))
-        if res:
-            self.prolog.retract(f"patrolArea(area({areaNum}), _)")
-        self.prolog.assertz(f"patrolArea(area({areaNum}), {'true' if patrol else 'false'})")
+        if areaNum in self.patrolState:
+            if self.patrolState[areaNum] == patrol:
+                return
+            self.retract(f"patrolArea(area({areaNum}), _)")
+        self.assertz(f"patrolArea(area({areaNum}), {'true' if patrol else 'false'})")
+        self.patrolState[areaNum] = patrol
 
     
 
@@ -142,8 +457,18 @@ class KB:
             areaNum (Int): il numero dell'area da rimuovere dalla lista delle aree pattugliate
         """
 
-        if list(self.prolog.query(f"patrolArea(area({areaNum}), _)")):
-            self.prolog.retract(f"patrolArea(area({areaNum}), _)")
+        if areaNum in self.patrolState:
+            self.retract(f"patrolArea(area({areaNum}), _)")
+            del self.patrolState[areaNum]
+
+
+    def clearPatrols(self):
+        """
+        Metodo che rimuove tutti i fatti patrolArea dalla base di conoscenza
+        """
+
+        list(self.query("retractall(patrolArea(_, _))"))
+        self.patrolState = {}
 
 
     def isAreaSafe(self, areaNum):
@@ -157,10 +482,24 @@ class KB:
             List: la lista delle soluzioni trovate dalla query isSafe(area(AreaNumber))
         """
 
-        res = list(self.prolog.query(f"isSafe(area({areaNum}))"))
+        res = list(self.query(f"isSafe(area({areaNum}))"))
         return res
     
 
+    def isAreaConsiderable(self, areaNum):
+        """
+        Metodo che verifica se l'area specificata è valutabile, cioè se tutte le aree entro la sua distanza massima hanno un fatto patrolArea
+
+        Parametri:
+            areaNum (Int): il numero dell'area da verificare
+
+        Returns:
+            Bool: True se l'area è valutabile, False altrimenti
+        """
+
+        return bool(list(self.query(f"isConsiderable(area({areaNum}))", maxresult=1)))
+    
+
     def getAreasList(self):
         """
         Metodo che restituisce la lista delle aree di Chicago
@@ -169,11 +508,7 @@ class KB:
             List: la lista delle aree di Chicago
         """
 
-        areasList = []
-        res = list(self.prolog.query("area(X)"))
-        for area in res:
-            areasList.append(area['X'])
-        return areasList
+        return list(self.areas)
     
 
     def getAreasByDistance(self, areaNum, distance):
@@ -188,11 +523,37 @@ class KB:
             List: la lista delle aree a distanza distance dall'area specificata
         """
 
-        areas = list(self.prolog.query(f"distance(area({areaNum}), area(X), {distance})"))
-        areasList = []
-        for area in areas:
-            areasList.append(area['X'])
-        return removeDuplicates(areasList)
+        return self.areaDistances.byDistance(areaNum, distance)
+    
+
+    def getAreasWithinDistance(self, areaNum, distance):
+        """
+        Metodo che restituisce la lista delle aree di Chicago a una distanza minore o uguale a quella specificata dall'area specificata
+
+        Parametri:
+            areaNum (Int): il numero dell'area di partenza
+            distance (Int): la distanza massima dall'area di partenza
+
+        Returns:
+            List: la lista delle aree entro la distanza distance dall'area specificata (compresa l'area stessa)
+        """
+
+        return self.areaDistances.within(areaNum, distance)
+
+
+    def getDistance(self, areaNum1, areaNum2):
+        """
+        Metodo che restituisce la distanza tra due aree, cioè il numero minimo di aree vicine da attraversare per passare dalla prima alla seconda
+
+        Parametri:
+            areaNum1 (Int): il numero della prima area
+            areaNum2 (Int): il numero della seconda area
+
+        Returns:
+            Int: la distanza tra le due aree, -1 se non sono collegate
+        """
+
+        return self.areaDistances.distance(areaNum1, areaNum2)
     
 
     def getAreaSeverity(self, areaNum):
@@ -206,8 +567,35 @@ class KB:
             Int: la gravità dei crimini dell'area specificata
         """
 
-        severity = list(self.prolog.query(f"severity(area({areaNum}), X)"))
-        return severity[0]['X']
+        return self.severities[areaNum]
+
+
+    def getAreaAdjustedSeverity(self, areaNum):
+        """
+        Metodo che restituisce la gravità dell'area specificata corretta in base alla sua dimensione
+
+        Parametri:
+            areaNum (Int): il numero dell'area
+
+        Returns:
+            Int: la gravità corretta dell'area specificata
+        """
+
+        return self.adjustedSeverities[areaNum]
+
+
+    def getAreaSize(self, areaNum):
+        """
+        Metodo che restituisce la dimensione dell'area specificata
+
+        Parametri:
+            areaNum (Int): il numero dell'area
+
+        Returns:
+            Float: la dimensione dell'area specificata
+        """
+
+        return self.sizes[areaNum]
     
 
     def evaluableAreas(self, areas):
@@ -221,9 +609,4 @@ class KB:
             List: la lista delle aree valutabili
         """
 
-        evAreas = list(self.prolog.query("isConsiderable(area(X))"))
-        areasList = []
-        for evArea in evAreas:
-            if evArea['X'] in areas:
-                areasList.append(evArea['X'])
-        return areasList
\ No newline at end of file
+        return filterEvaluable(areas, self.getConsiderableAreas())
\ No newline at end of file
@@ -0,0 +1,285 @@
+from util import getBasePath, hopDistanceMatrix, removeDuplicates, atomicWrite, writeJson
+import pandas as pd
+import numpy as np
+import shapely
+import hashlib
+import json
+import os
+
+
+def geometryHash(areasGdf):
+    """
+    Funzione che calcola l'hash del contenuto delle geometrie delle aree, usato per riconoscere i dati salvati su disco
+
+    Parametri:
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+
+    Returns:
+        String: l'hash dei numeri delle aree e delle loro geometrie
+    """
+
+    h = hashlib.sha256()
+    for areaNumber, geometry in zip(areasGdf['AreaNumber'], shapely.to_wkb(np.asarray(areasGdf['Perimeter'].values))):
+        h.update(str(int(areaNumber)).encode())
+        h.update(geometry)
+    return h.hexdigest()
+
+
+def computeNearAreas(areasGdf, cacheDir=None):
+    """
+    Funzione che calcola le aree vicine di ogni area.
+    Due aree sono considerate vicine se hanno due punti del loro perimetro in comune.
+    Le coppie candidate sono cercate con un indice spaziale (STRtree) e il risultato viene salvato su disco, identificato dall'hash
+    delle geometrie, così le esecuzioni successive lo leggono invece di ricalcolarlo
+
+    Parametri:
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+        cacheDir (String): la cartella in cui salvare le aree vicine. Se None viene usata /dataset/cache
+
+    Returns:
+        Dict: la lista delle aree vicine di ogni area
+    """
+
+    if cacheDir is None:
+        cacheDir = os.path.join(getBasePath(), "dataset", "cache")
+    cachePath = os.path.join(cacheDir, f"nearAreas_{geometryHash(areasGdf)}.json")
+    if os.path.exists(cachePath):
+        with open(cachePath, 'r') as file:
+            return {area: nearAreas for area, nearAreas in json.load(file)}
+
+    areaNumbers = [int(area) for area in areasGdf['AreaNumber']]
+    geometries = np.asarray(areasGdf['Perimeter'].values)
+    tree = shapely.STRtree(geometries)
+    # Coppie (i, j) di aree che si toccano, ordinate come nel GeoDataFrame
+    pairs = tree.query(geometries, predicate="touches")
+    nearAreas = {area: [] for area in areaNumbers}
+    for i, j in sorted(zip(pairs[0].tolist(), pairs[1].tolist())):
+        if i != j:
+            nearAreas[areaNumbers[i]].append(areaNumbers[j])
+
+    os.makedirs(cacheDir, exist_ok=True)
+    writeJson(cachePath, list(nearAreas.items()))
+    return nearAreas
+
+
+class AreaDistances:
+    """
+    Classe che contiene la distanza tra tutte le coppie di aree sul grafo delle vicinanze (numero minimo di aree vicine da attraversare)
+    e risponde alle richieste sulle aree a una certa distanza. È condivisa dalle basi di conoscenza KB e NumpyKB
+
+    Attributi:
+        areas (List): i numeri delle aree, nell'ordine usato per indicizzare la matrice
+        areaIndex (Dict): la posizione di ogni area nella matrice
+        matrix (ndarray): la matrice delle distanze, con -1 per le coppie di aree non collegate
+    """
+
+    def __init__(self, areas, nearAreas):
+        """
+        Costruttore della classe. Calcola la matrice delle distanze
+
+        Parametri:
+            areas (List): i numeri delle aree
+            nearAreas (Dict): la lista delle aree vicine di ogni area
+        """
+
+        self.areas = list(areas)
+        self.areaIndex = {area: i for i, area in enumerate(self.areas)}
+        adjacency = np.zeros((len(self.areas), len(self.areas)), dtype=bool)
+        for area, near in nearAreas.items():
+            for nearArea in near:
+                adjacency[self.areaIndex[area], self.areaIndex[nearArea]] = True
+        self.matrix = hopDistanceMatrix(adjacency)
+        # Cache delle aree a una certa distanza e entro una certa distanza, riempite alla prima richiesta
+        self.byDistanceCache = {}
+        self.withinCache = {}
+
+
+    def byDistance(self, areaNum, distance):
+        """
+        Funzione che restituisce le aree a una distanza specificata da un'area
+
+        Parametri:
+            areaNum (Int): il numero dell'area di partenza
+            distance (Int): la distanza dall'area di partenza
+
+        Returns:
+            List: la lista delle aree a distanza distance dall'area specificata
+        """
+
+        key = (areaNum, distance)
+        if key not in self.byDistanceCache:
+            row = self.matrix[self.areaIndex[areaNum]]
+            self.byDistanceCache[key] = [self.areas[i] for i in np.flatnonzero(row == distance)]
+        return list(self.byDistanceCache[key])
+
+
+    def within(self, areaNum, distance):
+        """
+        Funzione che restituisce le aree a una distanza minore o uguale a quella specificata da un'area
+
+        Parametri:
+            areaNum (Int): il numero dell'area di partenza
+            distance (Int): la distanza massima dall'area di partenza
+
+        Returns:
+            List: la lista delle aree entro la distanza distance dall'area specificata (compresa l'area stessa)
+        """
+
+        key = (areaNum, distance)
+        if key not in self.withinCache:
+            row = self.matrix[self.areaIndex[areaNum]]
+            self.withinCache[key] = [self.areas[i] for i in np.flatnonzero((row >= 0) & (row <= distance))]
+        return list(self.withinCache[key])
+
+
+    def distance(self, areaNum1, areaNum2):
+        """
+        Funzione che restituisce la distanza tra due aree
+
+        Parametri:
+            areaNum1 (Int): il numero della prima area
+            areaNum2 (Int): il numero della seconda area
+
+        Returns:
+            Int: la distanza tra le due aree, -1 se non sono collegate
+        """
+
+        return int(self.matrix[self.areaIndex[areaNum1], self.areaIndex[areaNum2]])
+
+
+def filterEvaluable(areas, considerable):
+    """
+    Funzione che restituisce, senza duplicati e nell'ordine dato, le aree che si trovano tra quelle valutabili
+
+    Parametri:
+        areas (List): la lista delle aree da cui selezionare le aree valutabili
+        considerable (Set): l'insieme delle aree valutabili
+
+    Returns:
+        List: la lista delle aree valutabili
+    """
+
+    return [area for area in removeDuplicates(areas) if area in considerable]
+
+
+def predictSeverities(model, areasGdf, week, day, timeslot):
+    """
+    Funzione che prevede la gravità dei crimini di ogni area con il modello di apprendimento, con una sola chiamata a predict
+
+    Parametri:
+        model (Pipeline): il modello di apprendimento addestrato
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago
+        week (Int): la settimana in cui si vuole effettuare la previsione
+        day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+        timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+
+    Returns:
+        Dict: la gravità prevista di ogni area
+    """
+
+    areas = [int(area) for area in areasGdf['AreaNumber']]
+    data = {
+        'Week': [week] * len(areas),
+        'Day': [day] * len(areas),
+        'Time Slot': [timeslot] * len(areas),
+        'Community Area': areas
+    }
+    predictions = model.predict(pd.DataFrame(data))
+    return {area: int(prediction) for area, prediction in zip(areas, predictions)}
+
+
+# Dimensioni del tensore delle gravità previste: numero dell'area, settimana, giorno della settimana e ora
+SEVERITY_SHAPE = (78, 54, 8, 24)
+
+# Tensori delle gravità già aperti, per percorso (percorso -> (data di modifica, tensore))
+severityTensors = {}
+
+
+def severityTensorPath(modelPath):
+    """
+    Funzione che restituisce il percorso del tensore delle gravità previste da un modello, salvato accanto al file del modello
+
+    Parametri:
+        modelPath (String): il percorso del modello
+
+    Returns:
+        String: il percorso del tensore
+    """
+
+    return os.path.splitext(modelPath)[0] + ".severities.npy"
+
+
+def buildSeverityTensor(model, areas, tensorPath):
+    """
+    Funzione che prevede con una sola chiamata a predict la gravità di tutte le combinazioni di area, settimana, giorno e ora
+    e la salva in un tensore int8. Le aree non richieste valgono -1
+
+    Parametri:
+        model (Pipeline): il modello di apprendimento addestrato
+        areas (List): i numeri delle aree da prevedere
+        tensorPath (String): il file in cui salvare il tensore
+    """
+
+    _, weeks, days, hours = SEVERITY_SHAPE
+    grid = np.array(np.meshgrid(areas, np.arange(weeks), np.arange(days), np.arange(hours), indexing='ij')).reshape(4, -1)
+    data = pd.DataFrame({'Week': grid[1], 'Day': grid[2], 'Time Slot': grid[3], 'Community Area': grid[0]})
+    tensor = np.full(SEVERITY_SHAPE, -1, dtype=np.int8)
+    tensor[grid[0], grid[1], grid[2], grid[3]] = np.asarray(model.predict(data)).astype(np.int8)
+
+    atomicWrite(tensorPath, lambda tmpPath: np.save(tmpPath, tensor), suffix=".npy")
+
+
+def loadSeverityTensor(modelPath, areas, getModel):
+    """
+    Funzione che restituisce il tensore delle gravità previste dal modello, aperto con memory mapping.
+    Il tensore viene calcolato se non esiste, se è più vecchio del modello o se non contiene tutte le aree richieste
+
+    Parametri:
+        modelPath (String): il percorso del modello
+        areas (List): i numeri delle aree richieste
+        getModel (Function): la funzione che restituisce il modello, chiamata solo se il tensore deve essere calcolato
+
+    Returns:
+        ndarray: il tensore delle gravità, indicizzato per [area, settimana, giorno, ora]
+    """
+
+    tensorPath = severityTensorPath(modelPath)
+    fresh = os.path.exists(tensorPath) and os.path.getmtime(tensorPath) >= os.path.getmtime(modelPath)
+    if fresh:
+        mtime = os.path.getmtime(tensorPath)
+        if tensorPath not in severityTensors or severityTensors[tensorPath][0] != mtime:
+            severityTensors[tensorPath] = (mtime, np.load(tensorPath, mmap_mode='r'))
+        tensor = severityTensors[tensorPath][1]
+        if (tensor[areas, 0, 0, 0] >= 0).all():
+            return tensor
+        # Aggiunta delle aree mancanti a quelle già presenti
+        areas = sorted(set(areas) | set(np.flatnonzero(tensor[:, 0, 0, 0] >= 0).tolist()))
+
+    buildSeverityTensor(getModel(), areas, tensorPath)
+    severityTensors[tensorPath] = (os.path.getmtime(tensorPath), np.load(tensorPath, mmap_mode='r'))
+    return severityTensors[tensorPath][1]
+
+
+def getSeverities(modelPath, areasGdf, week, day, timeslot, getModel):
+    """
+    Funzione che restituisce la gravità prevista di ogni area, leggendola dal tensore delle gravità del modello.
+    Le combinazioni fuori dal tensore vengono previste direttamente con il modello
+
+    Parametri:
+        modelPath (String): il percorso del modello
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago
+        week (Int): la settimana in cui si vuole effettuare la previsione
+        day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+        timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+        getModel (Function): la funzione che restituisce il modello, chiamata solo se serve una previsione
+
+    Returns:
+        Dict: la gravità prevista di ogni area
+    """
+
+    _, weeks, days, hours = SEVERITY_SHAPE
+    if not (0 <= week < weeks and 0 <= day < days and 0 <= timeslot < hours):
+        return predictSeverities(getModel(), areasGdf, week, day, timeslot)
+    areas = [int(area) for area in areasGdf['AreaNumber']]
+    tensor = loadSeverityTensor(modelPath, areas, getModel)
+    return {area: int(severity) for area, severity in zip(areas, tensor[areas, week, day, timeslot])}
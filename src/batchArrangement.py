@@ -0,0 +1,107 @@
+from cleanDataset import cleanChicagoAreas
+from knowledgeBase import createKB
+from patrolArrangement import PatrolArrangement as PA
+from solutionCache import SolutionCache
+from modelRegistry import registry
+import pandas as pd
+import argparse
+
+
+def parseRange(value):
+    """
+    Funzione che converte una stringa della forma "1-52" o "1,3,5" (anche combinate, ad esempio "1-3,7") nella lista dei valori indicati
+
+    Parametri:
+        value (String): la stringa da convertire
+
+    Returns:
+        List: la lista dei valori
+    """
+
+    values = []
+    for part in value.split(","):
+        if "-" in part:
+            start, end = part.split("-")
+            values += list(range(int(start), int(end) + 1))
+        else:
+            values.append(int(part))
+    return values
+
+
+def solveSchedule(areasGdf, modelPath, weeks, days, hours, outputPath, cache=None, kbBackend="prolog", **options):
+    """
+    Funzione che calcola la disposizione delle pattuglie per tutte le fasce orarie indicate e salva i risultati in un'unica tabella.
+    La base di conoscenza viene costruita una sola volta: per ogni fascia oraria vengono sostituiti solo i fatti sulla gravità.
+    Ogni ricerca parte dalla disposizione della fascia oraria precedente, usata come bound iniziale se è ancora valida.
+    Ogni riga viene aggiunta al file csv appena la fascia oraria è risolta, così un'interruzione non perde quelle già calcolate
+
+    Parametri:
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+        modelPath (String): il percorso del modello di apprendimento da usare per le previsioni
+        weeks (List): le settimane da risolvere
+        days (List): i giorni della settimana da risolvere
+        hours (List): le fasce orarie da risolvere
+        outputPath (String): il file csv in cui salvare i risultati
+        cache (SolutionCache): la cache delle disposizioni ottime, condivisa tra le fasce orarie
+        kbBackend (String): il backend della base di conoscenza, "prolog" oppure "numpy"
+        options: le opzioni passate a PatrolArrangement.findBestArrangement
+
+    Returns:
+        DataFrame: la tabella dei risultati, con una riga per ogni fascia oraria
+    """
+
+    slots = [(week, day, hour) for week in weeks for day in days for hour in hours]
+    kb = None
+    pa = None
+    previous = None
+    rows = []
+    for i, (week, day, hour) in enumerate(slots):
+        if kb is None:
+            kb = createKB(areasGdf, modelPath, week, day, hour, backend=kbBackend)
+            pa = PA(kb, cache=cache)
+        else:
+            kb.setSlot(week, day, hour)
+        sol = pa.findBestArrangement(initial=previous, verbose=False, **options)
+        cost = pa.arrangementCost(sol) if sol is not None else float('inf')
+        row = {
+            'Week': week,
+            'Day': day,
+            'Time Slot': hour,
+            'Cost': cost,
+            'Optimal': pa.optimal,
+            'Patrol Areas': " ".join(str(area) for area in sol if sol[area]) if sol is not None else ""
+        }
+        rows.append(row)
+        pd.DataFrame([row]).to_csv(outputPath, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+        print(f"[{i+1}/{len(slots)}] settimana {week}, giorno {day}, ora {hour}: costo {cost}")
+        if sol is not None:
+            previous = sol
+
+    if pa is not None:
+        pa.close()
+    if kb is not None:
+        kb.close()
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    models = registry.listModels()
+    parser = argparse.ArgumentParser(description="Calcolo della disposizione delle pattuglie per un insieme di fasce orarie")
+    parser.add_argument("--model", default=models[0] if models else None, required=not models,
+                        help="nome del modello presente in /learning/models (di default il primo in ordine alfabetico)")
+    parser.add_argument("--weeks", default="1-53", help="settimane ISO da risolvere, ad esempio 1-53 oppure 1,2,3")
+    parser.add_argument("--days", default="0-6", help="giorni della settimana da risolvere (0 = lunedì, 6 = domenica)")
+    parser.add_argument("--hours", default="0-23", help="ore del giorno da risolvere")
+    parser.add_argument("--output", default="schedule.csv", help="file csv dei risultati")
+    parser.add_argument("--engine", default="bitmask", choices=["dict", "bitmask"], help="rappresentazione del contesto della ricerca")
+    parser.add_argument("--backend", default="dfbnb", choices=["dfbnb", "milp"], help="risolutore da usare")
+    parser.add_argument("--kb", default="prolog", choices=["prolog", "numpy"], help="backend della base di conoscenza")
+    parser.add_argument("--cache-dir", default=None, help="cartella in cui salvare le soluzioni già calcolate, riusate tra esecuzioni diverse")
+    args = parser.parse_args()
+
+    # Pulizia del dataset delle aree di Chicago
+    chicagoAreasDf = cleanChicagoAreas()
+    modelPath = registry.getPath(args.model)
+    solveSchedule(chicagoAreasDf, modelPath, parseRange(args.weeks), parseRange(args.days), parseRange(args.hours), args.output,
+                    cache=SolutionCache(path=args.cache_dir), kbBackend=args.kb, engine=args.engine, backend=args.backend)
@@ -1,8 +1,11 @@
 import pandas as pd
+import numpy as np
+import glob
 import geopandas as gpd
-from shapely import wkt
+import shapely
+import hashlib
 import os
-from util import getBasePath
+from util import getBasePath, atomicWrite
 
 
 def getChicagoAreas():
@@ -22,30 +25,55 @@ def getChicagoAreas():
     return areas
 
 
-def cleanChicagoAreas():
+def cleanChicagoAreas(cacheDir=None):
     """
-    Funzione che sistema il dataset che contiene le aree di Chicago e lo restituisce
+    Funzione che sistema il dataset che contiene le aree di Chicago e lo restituisce.
+    Il risultato viene salvato in /dataset/cache con le geometrie in formato WKB, identificato dall'hash del file sorgente e delle aree
+    usate: le esecuzioni successive leggono il file salvato invece di rileggere il csv, che viene riletto solo se cambia
+
+    Parametri:
+        cacheDir (String): la cartella in cui salvare il dataset sistemato. Se None viene usata /dataset/cache
 
     Returns:
         GeoDataFrame: dataset delle aree di Chicago
     """
 
     dfPath = os.path.join(getBasePath(), "dataset", "chicagoAreas.csv")
-    # Lettura del dataset
-    df = pd.read_csv(dfPath)
-    # Rimozione delle colonne inutili
-    df = df.drop(columns=["perimeter", "area", "comarea_", "comarea_id", "area_numbe", "shape_len"])
+    areas = getChicagoAreas()
+    if cacheDir is None:
+        cacheDir = os.path.join(getBasePath(), "dataset", "cache")
+    h = hashlib.sha256()
+    with open(dfPath, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            h.update(chunk)
+    h.update(str(areas).encode())
+    cachePath = os.path.join(cacheDir, f"chicagoAreas_{h.hexdigest()}.pkl")
+
+    if os.path.exists(cachePath):
+        df = pd.read_pickle(cachePath)
+        df['Perimeter'] = shapely.from_wkb(df['Perimeter'].values)
+        return gpd.GeoDataFrame(df, geometry='Perimeter')
+
+    # Lettura del dataset, solo con le colonne utili
+    df = pd.read_csv(dfPath, usecols=["the_geom", "community", "area_num_1", "shape_area"])
     # Rinomina delle colonne
     df = df.rename(columns={"the_geom": "Perimeter", "community": "AreaName", "area_num_1": "AreaNumber", "shape_area": "AreaSize"})
+    # Rimozione delle aree non utilizzate, prima di convertire le geometrie
+    df = df[df['AreaNumber'].isin(areas)].copy()
+
+    # Salvataggio del dataset sistemato con le geometrie in formato WKB
+    os.makedirs(cacheDir, exist_ok=True)
+    geometries = shapely.from_wkt(df['Perimeter'].values)
+    cached = df.copy()
+    cached['Perimeter'] = shapely.to_wkb(geometries)
+    atomicWrite(cachePath, lambda tmpPath: cached.to_pickle(tmpPath, compression=None))
+
     # Converti la colonna contenente la geometria dell'area in una geometria utilizzabile
-    df['Perimeter'] = df['Perimeter'].apply(wkt.loads)
+    df['Perimeter'] = geometries
     # Crea un GeoDataFrame
     gdf = gpd.GeoDataFrame(df, geometry='Perimeter')
-    # Rimozione delle aree non utilizzate
-    areas = getChicagoAreas()
-    gdf = gdf[gdf['AreaNumber'].isin(areas)]
 
-    # Colonne rimaste: AreaNumber, AreaName, Perimeter
+    # Colonne rimaste: AreaNumber, AreaName, Perimeter, AreaSize
     return gdf
 
 
@@ -76,47 +104,97 @@ def divideCrimeType():
     return crimeSeverity
 
 
-def cleanChicagoCrimes():
+def cleanChicagoCrimes(paths=None, chunkSize=500000):
     """
-    Funzione che sistema il dataset che contiene i crimini di Chicago e lo restituisce
+    Funzione che sistema il dataset che contiene i crimini di Chicago e lo restituisce.
+    I file vengono letti a blocchi di chunkSize righe, solo con le colonne utili e con tipi compatti, e ogni blocco viene ridotto
+    subito alle colonne finali: la memoria usata dipende dalla dimensione dei blocchi e non da quella dei file
+
+    Parametri:
+        paths (List): i file csv dei crimini da leggere. Se None vengono letti tutti i file /dataset/chicagoCrimes*.csv
+        chunkSize (Int): il numero di righe lette per ogni blocco
 
     Returns:
         DataFrame: dataset dei crimini di Chicago
     """
 
-    dfPath = os.path.join(getBasePath(), "dataset", "chicagoCrimes2018.csv")
-    # Lettura del dataset
-    df = pd.read_csv(dfPath)
-    # Rimozione delle colonne inutili
-    df = df.drop(columns=["ID", "Case Number", "Block", "IUCR", "Description", "Beat", "Location Description", "District", "Ward", "FBI Code", "X Coordinate", "Y Coordinate", "Year", "Updated On", "Latitude", "Longitude", "Location"])
-    # Rimozione dei crimini nelle aree non utilizzate
+    if paths is None:
+        paths = sorted(glob.glob(os.path.join(getBasePath(), "dataset", "chicagoCrimes*.csv")))
+    if len(paths) == 0:
+        raise FileNotFoundError("Nessun dataset dei crimini trovato in /dataset")
+
+    chunks = []
+    for dfPath in paths:
+        chunks += list(readCrimesChunks(dfPath, chunkSize))
+
+    df = pd.concat(chunks, ignore_index=True)
+
+    # Colonne rimaste: Community Area, Week, Day, Time Slot, Severity
+    return df
+
+
+def readCrimesChunks(dfPath, chunkSize=500000, keepId=False):
+    """
+    Funzione che legge un file csv dei crimini di Chicago a blocchi, solo con le colonne utili e con tipi compatti,
+    e restituisce i blocchi già sistemati
+
+    Parametri:
+        dfPath (String): il file csv dei crimini
+        chunkSize (Int): il numero di righe lette per ogni blocco
+        keepId (Bool): se True i blocchi contengono anche la colonna ID con l'identificativo di ogni crimine
+
+    Returns:
+        Generator: i blocchi sistemati, con le colonne Community Area, Week, Day, Time Slot e Severity (e ID se keepId è True)
+    """
+
     areas = getChicagoAreas()
-    df = df[df['Community Area'].isin(areas)]
-    # Eliminazione delle righe con valori nulli
-    df = df.dropna()
-    # Sostituzione della colonna Date con le colonne Week, Day e Time Slot
-    df['Date'] = pd.to_datetime(df['Date'], format='%m/%d/%Y %I:%M:%S %p')
-    df['Week'] = df['Date'].dt.isocalendar().week
-    df['Day'] = df['Date'].dt.dayofweek
-    df['Time Slot'] = df['Date'].dt.hour
-    df.drop(columns=['Date'], inplace=True)
-    # Conversione della colonna Week in intero
-    df['Week'] = df['Week'].astype(int)
-    # Conversione della colonna Community Area in intero
-    df['Community Area'] = df['Community Area'].astype(int)
-    # Conversione dei tipi di crimine in base alla loro gravità e rinomina della colonna
     crimeSeverity = divideCrimeType()
-    df['Primary Type'] = df['Primary Type'].str.lower().map(crimeSeverity)
-    df = df.rename(columns={"Primary Type": "Crime Severity"})
+    columns = ["Date", "Primary Type", "Arrest", "Domestic", "Community Area"]
+    dtypes = {"Date": "string", "Primary Type": "category", "Arrest": "boolean", "Domestic": "boolean", "Community Area": "float32"}
+    if keepId:
+        columns.append("ID")
+        dtypes["ID"] = "int64"
+    for chunk in pd.read_csv(dfPath, usecols=columns, dtype=dtypes, chunksize=chunkSize):
+        yield cleanCrimesChunk(chunk, areas, crimeSeverity)
+
 
-    # Converto le colonne Arrest e Domestic in interi (0 = False, 2 = True)
-    df['Arrest'] = df['Arrest'].astype(int)*2
-    df['Domestic'] = df['Domestic'].astype(int)*2
+def cleanCrimesChunk(chunk, areas, crimeSeverity):
+    """
+    Funzione che sistema un blocco del dataset dei crimini di Chicago
+
+    Parametri:
+        chunk (DataFrame): il blocco da sistemare, con le colonne Date, Primary Type, Arrest, Domestic e Community Area (ed eventualmente ID)
+        areas (List): le aree di Chicago utilizzate
+        crimeSeverity (Dict): dizionario che mappa i tipi di crimine con la loro gravità
 
-    # Creo la colonna "Severity" che è la media tra "Crime Severity", "Arrest" e "Domestic", arrotondata normalmente all'intero più vicino
-    df['Severity'] = df[['Crime Severity', 'Arrest', 'Domestic']].mean(axis=1).round().astype(int)
-    # Rimozione delle colonne inutili
-    df = df.drop(columns=["Crime Severity", "Arrest", "Domestic"])
+    Returns:
+        DataFrame: il blocco sistemato, con le colonne Community Area, Week, Day, Time Slot e Severity (e ID se presente nel blocco)
+    """
 
-    # Colonne rimaste: Severity, Community Area, Week, Day, Time Slot
-    return df
\ No newline at end of file
+    # Rimozione dei crimini nelle aree non utilizzate
+    chunk = chunk[chunk['Community Area'].isin(areas)]
+    # Eliminazione delle righe con valori nulli
+    chunk = chunk.dropna()
+    # Sostituzione della colonna Date con le colonne Week, Day e Time Slot
+    date = pd.to_datetime(chunk['Date'], format='%m/%d/%Y %I:%M:%S %p', cache=True)
+    # Conversione dei tipi di crimine in base alla loro gravità: la gravità viene calcolata una volta per categoria.
+    # I tipi non presenti nel dizionario hanno gravità NaN e non contribuiscono alla media
+    categories = chunk['Primary Type'].cat.categories
+    categorySeverity = np.append(categories.str.lower().map(crimeSeverity).to_numpy(dtype=float), np.nan)
+    crime = categorySeverity[chunk['Primary Type'].cat.codes.to_numpy()]
+    # Le colonne Arrest e Domestic valgono 0 se False e 2 se True
+    arrest = chunk['Arrest'].to_numpy(dtype=float) * 2
+    domestic = chunk['Domestic'].to_numpy(dtype=float) * 2
+    # La colonna "Severity" è la media tra gravità del crimine, "Arrest" e "Domestic", arrotondata normalmente all'intero più vicino
+    severity = np.where(np.isnan(crime), (arrest + domestic) / 2, (crime + arrest + domestic) / 3)
+
+    df = pd.DataFrame({
+        'Community Area': chunk['Community Area'].to_numpy().astype(np.int8),
+        'Week': date.dt.isocalendar().week.to_numpy().astype(np.int8),
+        'Day': date.dt.dayofweek.to_numpy().astype(np.int8),
+        'Time Slot': date.dt.hour.to_numpy().astype(np.int8),
+        'Severity': np.round(severity).astype(np.int8)
+    })
+    if 'ID' in chunk.columns:
+        df['ID'] = chunk['ID'].to_numpy(dtype=np.int64)
+    return df
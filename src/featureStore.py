@@ -0,0 +1,353 @@
+from cleanDataset import readCrimesChunks
+from util import getBasePath, atomicWrite, writeJson
+import pandas as pd
+import numpy as np
+import hashlib
+import shutil
+import glob
+import json
+import os
+
+
+class FeatureStore:
+    """
+    Classe che memorizza su disco il numero di crimini per ogni combinazione di area, settimana, giorno, fascia oraria e gravità.
+    I conteggi sono salvati in un array NumPy letto con memory mapping, gli identificativi dei crimini già contati in un secondo array
+    e un file manifest.json tiene traccia delle sorgenti elaborate: l'aggiunta di nuovi dati aggiorna i conteggi senza rielaborare
+    quelli già presenti e senza contare due volte lo stesso crimine.
+    Ogni aggiornamento scrive una nuova versione dei due array e il manifest indica la versione corrente: il manifest viene scritto
+    per ultimo, quindi un'interruzione a metà aggiornamento lascia valida la versione precedente
+
+    Attributi:
+        path (String): la cartella in cui sono salvati i conteggi e il manifest
+    """
+
+    __all__ = ['ingest', 'ingestFile', 'ingestFrame', 'toDataFrame', 'getSeverityCounts', 'getSeverity']
+
+    # Dimensioni dell'array dei conteggi: numero dell'area, settimana ISO, giorno della settimana, ora e gravità
+    shape = (78, 54, 7, 24, 3)
+
+
+    def __init__(self, path=None):
+        """
+        Costruttore della classe. Crea la cartella, gli array e il manifest se non esistono
+
+        Parametri:
+            path (String): la cartella in cui salvare i conteggi. Se None viene usata /dataset/featureStore
+        """
+
+        if path is None:
+            path = os.path.join(getBasePath(), "dataset", "featureStore")
+        self.path = path
+        self.manifestPath = os.path.join(path, "manifest.json")
+        if not os.path.exists(path):
+            os.makedirs(path)
+        if not os.path.exists(self.manifestPath):
+            counts = np.zeros(self.shape, dtype=np.int32)
+            ids = np.zeros(0, dtype=np.int64)
+            atomicWrite(self.versionPath("counts", 0), lambda tmpPath: np.save(tmpPath, counts), suffix=".npy")
+            atomicWrite(self.versionPath("ids", 0), lambda tmpPath: np.save(tmpPath, ids), suffix=".npy")
+            self.writeManifest({'version': 0, 'sources': {}})
+        self.manifest = self.readManifest()
+
+
+    def versionPath(self, name, version=None):
+        """
+        Funzione che restituisce il percorso di una versione di un array del feature store
+
+        Parametri:
+            name (String): il nome dell'array, "counts" oppure "ids"
+            version (Int): la versione. Se None viene usata quella corrente del manifest
+
+        Returns:
+            String: il percorso dell'array
+        """
+
+        if version is None:
+            version = self.manifest['version']
+        return os.path.join(self.path, f"{name}_{version}.npy")
+
+
+    def readManifest(self):
+        """
+        Funzione che legge il manifest delle sorgenti già elaborate
+
+        Returns:
+            Dict: il manifest
+        """
+
+        with open(self.manifestPath, 'r') as file:
+            return json.load(file)
+
+
+    def writeManifest(self, manifest):
+        """
+        Metodo che salva il manifest delle sorgenti già elaborate
+
+        Parametri:
+            manifest (Dict): il manifest da salvare
+        """
+
+        writeJson(self.manifestPath, manifest, indent=4)
+
+
+    def getCounts(self):
+        """
+        Funzione che restituisce l'array dei conteggi in sola lettura, senza caricarlo in memoria
+
+        Returns:
+            ndarray: i conteggi indicizzati per [area, settimana, giorno, ora, gravità]
+        """
+
+        return np.load(self.versionPath("counts"), mmap_mode='r')
+
+
+    def getIds(self):
+        """
+        Funzione che restituisce gli identificativi dei crimini già contati
+
+        Returns:
+            ndarray: gli identificativi ordinati
+        """
+
+        return np.load(self.versionPath("ids"))
+
+
+    def fileHash(self, filePath):
+        """
+        Funzione che calcola l'hash del contenuto di un file
+
+        Parametri:
+            filePath (String): il percorso del file
+
+        Returns:
+            String: l'hash del file
+        """
+
+        h = hashlib.sha256()
+        with open(filePath, 'rb') as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+
+    def ingest(self, paths=None, chunkSize=500000):
+        """
+        Funzione che aggiunge ai conteggi i crimini non ancora contati dei file dei crimini
+
+        Parametri:
+            paths (List): i file csv dei crimini. Se None vengono usati tutti i file /dataset/chicagoCrimes*.csv
+            chunkSize (Int): il numero di righe lette per ogni blocco
+
+        Returns:
+            Int: il numero di file da cui sono stati aggiunti crimini
+        """
+
+        if paths is None:
+            paths = sorted(glob.glob(os.path.join(getBasePath(), "dataset", "chicagoCrimes*.csv")))
+        added = 0
+        for filePath in paths:
+            if self.ingestFile(filePath, chunkSize):
+                added += 1
+        return added
+
+
+    def ingestFile(self, filePath, chunkSize=500000):
+        """
+        Funzione che aggiunge ai conteggi i crimini di un file csv non ancora contati.
+        I crimini sono riconosciuti dalla colonna ID, quindi un file scaricato di nuovo con altri mesi in aggiunta
+        (o con righe in comune con altri file) aggiunge solo i crimini nuovi. Un file identico a quello già elaborato non viene letto
+
+        Parametri:
+            filePath (String): il file csv dei crimini
+            chunkSize (Int): il numero di righe lette per ogni blocco
+
+        Returns:
+            Bool: True se sono stati aggiunti crimini, False se erano già tutti presenti
+        """
+
+        source = os.path.basename(filePath)
+        contentHash = self.fileHash(filePath)
+        known = self.manifest['sources'].get(source)
+        if known is not None and known.get('hash') == contentHash:
+            return False
+
+        delta = np.zeros(self.shape, dtype=np.int32)
+        ids = self.getIds()
+        rows = 0
+        for chunk in readCrimesChunks(filePath, chunkSize, keepId=True):
+            chunk, ids = self.newCrimes(chunk, ids)
+            rows += self.accumulate(delta, chunk)
+        info = {'file': source, 'hash': contentHash, 'rows': rows + (known['rows'] if known is not None else 0)}
+        self.apply(delta, source, info, ids)
+        return rows > 0
+
+
+    def ingestFrame(self, df, source):
+        """
+        Funzione che aggiunge ai conteggi un dataset dei crimini già sistemato (ad esempio da cleanChicagoCrimes).
+        Se il dataset ha la colonna ID vengono aggiunti solo i crimini non ancora contati
+
+        Parametri:
+            df (DataFrame): il dataset con le colonne Community Area, Week, Day, Time Slot e Severity (ed eventualmente ID)
+            source (String): l'identificativo della sorgente, usato per non aggiungere due volte gli stessi dati
+
+        Returns:
+            Bool: True se il dataset è stato aggiunto, False se la sorgente era già presente
+        """
+
+        if source in self.manifest['sources']:
+            return False
+        ids = None
+        if 'ID' in df.columns:
+            df, ids = self.newCrimes(df, self.getIds())
+        delta = np.zeros(self.shape, dtype=np.int32)
+        rows = self.accumulate(delta, df)
+        self.apply(delta, source, {'rows': rows}, ids)
+        return True
+
+
+    def newCrimes(self, df, ids):
+        """
+        Funzione che seleziona le righe di crimini non ancora contati (né già presenti nelle righe precedenti del dataset)
+
+        Parametri:
+            df (DataFrame): il dataset con la colonna ID
+            ids (ndarray): gli identificativi ordinati dei crimini già contati
+
+        Returns:
+            Tuple: le righe dei crimini nuovi e gli identificativi ordinati aggiornati
+        """
+
+        chunkIds = df['ID'].to_numpy(dtype=np.int64)
+        _, first = np.unique(chunkIds, return_index=True)
+        new = np.zeros(len(df), dtype=bool)
+        new[first] = True
+        new &= ~np.isin(chunkIds, ids, assume_unique=False)
+        return df[new], np.union1d(ids, chunkIds[new])
+
+
+    def accumulate(self, delta, df):
+        """
+        Funzione che somma a delta i conteggi delle righe del dataset
+
+        Parametri:
+            delta (ndarray): l'array dei conteggi da aggiornare
+            df (DataFrame): il dataset con le colonne Community Area, Week, Day, Time Slot e Severity
+
+        Returns:
+            Int: il numero di righe aggiunte
+        """
+
+        index = tuple(df[column].to_numpy(dtype=np.intp) for column in ['Community Area', 'Week', 'Day', 'Time Slot', 'Severity'])
+        np.add.at(delta, index, 1)
+        return len(df)
+
+
+    def apply(self, delta, source, info, ids=None):
+        """
+        Metodo che somma delta ai conteggi salvati e registra la sorgente nel manifest.
+        Conteggi e identificativi vengono scritti in una nuova versione e il manifest, scritto per ultimo, la rende corrente:
+        se l'aggiornamento si interrompe prima, il manifest indica ancora la versione precedente e nessun crimine viene contato due volte
+
+        Parametri:
+            delta (ndarray): i conteggi da aggiungere
+            source (String): l'identificativo della sorgente
+            info (Dict): le informazioni sulla sorgente da salvare nel manifest
+            ids (ndarray): gli identificativi ordinati dei crimini contati dopo l'aggiornamento. Se None restano quelli correnti
+        """
+
+        previous = self.manifest['version']
+        version = previous + 1
+
+        def writeCounts(tmpPath):
+            shutil.copyfile(self.versionPath("counts"), tmpPath)
+            counts = np.load(tmpPath, mmap_mode='r+')
+            counts += delta
+            counts.flush()
+            del counts
+
+        if ids is None:
+            ids = self.getIds()
+        atomicWrite(self.versionPath("counts", version), writeCounts, suffix=".npy")
+        atomicWrite(self.versionPath("ids", version), lambda tmpPath: np.save(tmpPath, ids), suffix=".npy")
+
+        manifest = {'version': version, 'sources': dict(self.manifest['sources'])}
+        manifest['sources'][source] = info
+        self.writeManifest(manifest)
+        self.manifest = manifest
+
+        for name in ("counts", "ids"):
+            os.remove(self.versionPath(name, previous))
+
+
+    def toDataFrame(self, weighted=False, seed=0):
+        """
+        Funzione che restituisce il dataset dei crimini ricostruito dai conteggi
+
+        Parametri:
+            weighted (Bool): se True viene restituita una riga per ogni combinazione presente, con il numero di crimini nella colonna Count.
+                Se False ogni combinazione viene ripetuta tante volte quanti sono i crimini, come nel dataset di cleanChicagoCrimes
+            seed (Int): il seme usato per mescolare le righe. Le righe lette dai conteggi sono ordinate per area, settimana, giorno e ora:
+                vengono mescolate perché le divisioni del dataset senza mescolamento (ad esempio nella learning curve) non separino le aree
+
+        Returns:
+            DataFrame: il dataset con le colonne Community Area, Week, Day, Time Slot e Severity (e Count se weighted è True)
+        """
+
+        counts = self.getCounts()
+        index = np.nonzero(counts)
+        values = counts[index]
+        if not weighted:
+            index = tuple(np.repeat(i, values) for i in index)
+        order = np.random.default_rng(seed).permutation(len(index[0]))
+        index = tuple(i[order] for i in index)
+        if weighted:
+            values = values[order]
+        df = pd.DataFrame({
+            'Community Area': index[0].astype(np.int8),
+            'Week': index[1].astype(np.int8),
+            'Day': index[2].astype(np.int8),
+            'Time Slot': index[3].astype(np.int8),
+            'Severity': index[4].astype(np.int8)
+        })
+        if weighted:
+            df['Count'] = values.astype(np.int64)
+        return df
+
+
+    def getSeverityCounts(self, area, week, day, timeslot):
+        """
+        Funzione che restituisce il numero di crimini di ogni gravità registrati per un'area in una fascia oraria
+
+        Parametri:
+            area (Int): il numero dell'area
+            week (Int): la settimana
+            day (Int): il giorno della settimana
+            timeslot (Int): la fascia oraria
+
+        Returns:
+            ndarray: il numero di crimini con gravità 0, 1 e 2
+        """
+
+        return np.array(self.getCounts()[area, week, day, timeslot])
+
+
+    def getSeverity(self, area, week, day, timeslot):
+        """
+        Funzione che restituisce la gravità più frequente dei crimini registrati per un'area in una fascia oraria
+
+        Parametri:
+            area (Int): il numero dell'area
+            week (Int): la settimana
+            day (Int): il giorno della settimana
+            timeslot (Int): la fascia oraria
+
+        Returns:
+            Int: la gravità più frequente, None se non ci sono crimini registrati
+        """
+
+        counts = self.getSeverityCounts(area, week, day, timeslot)
+        if counts.sum() == 0:
+            return None
+        return int(counts.argmax())
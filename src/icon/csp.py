@@ -1,6 +1,7 @@
 from util import removeElements
+import time
 
-__all__ = ['optimizationCsp']
+__all__ = ['optimizationCsp', 'bitmaskOptimizationCsp']
 
 class optimizationCsp:
     """
@@ -11,16 +12,22 @@ class optimizationCsp:
         constraints (list): Lista dei vincoli del problema\n
         domains (dict): Dizionario dei domini delle variabili del problema\n
         cost_function (function): Funzione che calcola il costo del contesto specificato in base ai vincoli che possono essere valutati\n
-        heuristic_function (function): Funzione che restituisce l'euristica h per il contesto specificato sulla base dei vincoli non ancora soddisfatti\n
+        heuristic_function (function): Funzione h(rem_Cs, context) che restituisce l'euristica h per il contesto specificato sulla base dei vincoli non ancora soddisfatti. Deve essere un limite inferiore del costo ancora da aggiungere\n
         evaluableConstraints_function (function): Funzione che restituisce la lista delle aree valutabili\n
         selectVariable_function (function): Funzione che seleziona la variabile da assegnare in base al contesto specificato e alle variabili rimanenti. Se non specificata, viene utilizzata la funzione di default che seleziona la prima variabile della lista delle variabili rimanenti\n
-        bound (float): Limite superiore del costo del contesto
+        bound (float): Limite superiore del costo del contesto\n
+        iterative (bool): Se True la ricerca viene eseguita senza ricorsione, con uno stack esplicito, e può essere sospesa, ripresa e salvata\n
+        incumbent (Value): Valore condiviso tra processi (multiprocessing.Value) con il costo della migliore soluzione trovata globalmente. Se specificato la ricerca pota rispetto a questo valore e lo aggiorna quando migliora\n
+        verbose (bool): Se True vengono stampati i messaggi di inizio e fine risoluzione\n
+        onSolution (function): Funzione onSolution(asst, cost) chiamata ogni volta che viene trovata un'assegnazione migliore\n
+        timeLimit (float): Tempo massimo in secondi della ricerca. Se superato la ricerca si ferma e restituisce la migliore assegnazione trovata\n
+        maxNodes (int): Numero massimo di nodi da esplorare. Se superato la ricerca si ferma e restituisce la migliore assegnazione trovata
     """
 
-    __all__ = ['solve']
+    __all__ = ['solve', 'split', 'start', 'resume', 'pause', 'checkpoint', 'restore']
 
 
-    def __init__(self, variables, constraints, domains, cost_function, heuristic_function, evaluableConstraints_function, selectVariable_function=None, bound=float('inf')):
+    def __init__(self, variables, constraints, domains, cost_function, heuristic_function, evaluableConstraints_function, selectVariable_function=None, bound=float('inf'), iterative=False, incumbent=None, verbose=True, onSolution=None, timeLimit=None, maxNodes=None):
         self.Vs = variables
         self.Cs = constraints
         self.Ds = domains
@@ -29,27 +36,283 @@ class optimizationCsp:
         self.evalCs = evaluableConstraints_function
         self.bound = bound
         self.best_asst = None
+        self.stats = {'nodes': 0, 'pruned': 0, 'solutions': 0}
+        self.incumbent = incumbent
+        self.verbose = verbose
+        self.onSolution = onSolution
+        self.timeLimit = timeLimit
+        self.maxNodes = maxNodes
+        self.deadline = None
+        self.stopped = False
+        self.finished = False
+        self.iterative = iterative
+        self.stack = []
+        self.context = {}
+        self.CVs = []
+        self.paused = False
         if selectVariable_function is None:
             self.selectVariable = self.selectVariable_default
         else:
             self.selectVariable = selectVariable_function
 
 
-    def solve(self):
+    def solve(self, context=None):
         """
         Funzione di risoluzione del problema di CSP.
         Restituisce la migliore assegnazione delle variabili del problema.
 
+        Parametri:
+            context (Dict): assegnazione parziale da cui far partire la ricerca. Se None la ricerca parte dal contesto vuoto
+
         Returns:
             Dict: La migliore assegnazione delle variabili del problema
         """
 
-        print("Inizio risoluzione CSP...")
-        self.cbsearch(self.Vs, self.Cs, {})
+        if self.verbose:
+            print("Inizio risoluzione CSP...")
+        if self.iterative:
+            self.start(context)
+            self.resume()
+        else:
+            self.startBudget()
+            self.stats = {'nodes': 0, 'pruned': 0, 'solutions': 0}
+            context = {} if context is None else dict(context)
+            self.cbsearch([var for var in self.Vs if var not in context], self.Cs, context)
+            self.finished = not self.stopped
+        if self.verbose:
+            print(f"Fine risoluzione CSP: {self.stats['nodes']} nodi esplorati, {self.stats['pruned']} potati")
 
         return self.best_asst
 
 
+    def split(self, depth):
+        """
+        Funzione che divide il problema in sottoproblemi indipendenti espandendo i primi livelli dell'albero di ricerca.
+        I nodi che non possono portare a una soluzione migliore del bound corrente vengono scartati
+
+        Parametri:
+            depth (int): numero di livelli da espandere
+
+        Returns:
+            List: la lista dei contesti parziali che identificano i sottoproblemi, da risolvere con solve(context)
+        """
+
+        subproblems = []
+        self.splitSearch(list(self.Vs), self.Cs, {}, depth, subproblems)
+        return subproblems
+
+
+    def splitSearch(self, CVs, CCs, context, depth, subproblems):
+        """
+        Metodo ricorsivo usato da split per espandere i primi livelli dell'albero di ricerca
+
+        Attributes:
+            CVs (list): Lista delle variabili rimanenti da assegnare
+            CCs (list): Lista dei vincoli rimanenti da soddisfare
+            context (dict): Il contesto corrente
+            depth (int): numero di livelli ancora da espandere
+            subproblems (list): lista in cui vengono aggiunti i contesti dei sottoproblemi
+        """
+
+        can_eval = self.evalCs(CCs, context)
+        rem_Cs = removeElements(CCs, can_eval)
+        cost_context = self.cost(context, can_eval)
+
+        if cost_context + self.h(rem_Cs, context) < self.currentBound():
+            if depth == 0 or not CVs:
+                subproblems.append(context)
+            else:
+                var = self.selectVariable(CVs, context)
+                for val in self.Ds[var]:
+                    CVs2 = CVs.copy()
+                    CVs2.remove(var)
+                    context2 = context.copy()
+                    context2[var] = val
+                    self.splitSearch(CVs2, rem_Cs, context2, depth - 1, subproblems)
+
+
+    def currentBound(self):
+        """
+        Funzione che restituisce il bound da usare per la potatura: il minimo tra il bound locale e quello condiviso, se presente
+
+        Returns:
+            Float: il bound corrente
+        """
+
+        if self.incumbent is None:
+            return self.bound
+        return min(self.bound, self.incumbent.value)
+
+
+    def updateBest(self, asst, cost):
+        """
+        Metodo che registra una nuova migliore assegnazione e aggiorna il bound locale e quello condiviso, se presente
+
+        Parametri:
+            asst (Dict): la nuova migliore assegnazione
+            cost (float): il costo dell'assegnazione
+        """
+
+        self.best_asst = asst
+        self.bound = cost
+        self.stats['solutions'] += 1
+        if self.onSolution is not None:
+            self.onSolution(dict(asst), cost)
+        if self.incumbent is not None:
+            with self.incumbent.get_lock():
+                if cost < self.incumbent.value:
+                    self.incumbent.value = cost
+
+
+    def startBudget(self):
+        """
+        Metodo che inizializza il limite di tempo e di nodi della ricerca
+        """
+
+        self.stopped = False
+        self.finished = False
+        self.deadline = None if self.timeLimit is None else time.monotonic() + self.timeLimit
+
+
+    def budgetExceeded(self):
+        """
+        Funzione che verifica se la ricerca ha superato il limite di tempo o di nodi. Una volta superato, la ricerca resta ferma
+
+        Returns:
+            Bool: True se la ricerca deve fermarsi, False altrimenti
+        """
+
+        if not self.stopped:
+            if self.maxNodes is not None and self.stats['nodes'] >= self.maxNodes:
+                self.stopped = True
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.stopped = True
+        return self.stopped
+
+
+    def start(self, context=None):
+        """
+        Metodo che prepara la ricerca iterativa valutando il nodo radice.
+        La ricerca prosegue chiamando resume
+
+        Parametri:
+            context (Dict): assegnazione parziale da cui far partire la ricerca. Se None la ricerca parte dal contesto vuoto
+        """
+
+        self.startBudget()
+        self.stack = []
+        self.context = {} if context is None else dict(context)
+        self.CVs = [var for var in self.Vs if var not in self.context]
+        self.paused = False
+        self.stats = {'nodes': 0, 'pruned': 0, 'solutions': 0}
+        self.visit(self.Cs)
+
+
+    def resume(self, maxNodes=None):
+        """
+        Metodo che esegue la ricerca branch-and-bound iterativa a partire dallo stato corrente.
+        Ogni elemento dello stack contiene la variabile assegnata a quella profondità, la sua posizione nella lista delle variabili
+        rimanenti, i vincoli rimanenti e l'indice del prossimo valore del dominio da provare: queste informazioni servono anche
+        per annullare l'assegnazione quando si torna indietro
+
+        Parametri:
+            maxNodes (int): numero massimo di nodi da esplorare prima di sospendere la ricerca. Se None, la ricerca prosegue fino alla fine o fino a una chiamata a pause
+
+        Returns:
+            Bool: True se la ricerca è terminata, False se è stata sospesa o ha superato il limite di tempo o di nodi
+        """
+
+        self.paused = False
+        nodes = 0
+        while self.stack:
+            if self.paused or (maxNodes is not None and nodes >= maxNodes) or self.budgetExceeded():
+                return False
+            frame = self.stack[-1]
+            var, pos, rem_Cs, i = frame
+            values = self.Ds[var]
+            if i == len(values):
+                # Tutti i valori sono stati provati: si annulla l'assegnazione della variabile
+                self.stack.pop()
+                self.context.pop(var, None)
+                self.CVs.insert(pos, var)
+                continue
+            frame[3] = i + 1
+            self.context[var] = values[i]
+            nodes += 1
+            self.visit(rem_Cs)
+        self.finished = True
+        return True
+
+
+    def pause(self):
+        """
+        Metodo che richiede la sospensione della ricerca iterativa. La ricerca si ferma prima di esplorare il prossimo nodo
+        """
+
+        self.paused = True
+
+
+    def checkpoint(self):
+        """
+        Funzione che restituisce una copia dello stato della ricerca iterativa, che può essere salvata e ripristinata con restore
+
+        Returns:
+            Dict: lo stato della ricerca
+        """
+
+        return {
+            'stack': [list(frame[:2]) + [list(frame[2]), frame[3]] for frame in self.stack],
+            'context': dict(self.context),
+            'CVs': list(self.CVs),
+            'bound': self.bound,
+            'best_asst': None if self.best_asst is None else dict(self.best_asst),
+            'stats': dict(self.stats)
+        }
+
+
+    def restore(self, state):
+        """
+        Metodo che ripristina lo stato della ricerca iterativa salvato con checkpoint. La ricerca prosegue chiamando resume
+
+        Parametri:
+            state (Dict): lo stato della ricerca
+        """
+
+        self.stack = [list(frame[:2]) + [list(frame[2]), frame[3]] for frame in state['stack']]
+        self.context = dict(state['context'])
+        self.CVs = list(state['CVs'])
+        self.bound = state['bound']
+        self.best_asst = None if state['best_asst'] is None else dict(state['best_asst'])
+        self.stats = dict(state['stats'])
+
+
+    def visit(self, CCs):
+        """
+        Metodo che valuta il nodo corrente della ricerca iterativa (self.context, self.CVs).
+        Se il nodo non viene potato ed è completo aggiorna la migliore assegnazione, altrimenti sceglie la prossima variabile
+        e la aggiunge allo stack
+
+        Attributes:
+            CCs (list): Lista dei vincoli rimanenti da soddisfare
+        """
+
+        self.stats['nodes'] += 1
+        can_eval = self.evalCs(CCs, self.context)
+        rem_Cs = removeElements(CCs, can_eval)
+        cost_context = self.cost(self.context, can_eval)
+
+        if cost_context + self.h(rem_Cs, self.context) < self.currentBound():
+            if not self.CVs:
+                self.updateBest(dict(self.context), cost_context)
+            else:
+                var = self.selectVariable(self.CVs, self.context)
+                pos = self.CVs.index(var)
+                self.CVs.pop(pos)
+                self.stack.append([var, pos, rem_Cs, 0])
+        else:
+            self.stats['pruned'] += 1
+
+
     def cbsearch(self, CVs, CCs, context):
         """
         Metodo ricorsivo della ricerca branch-and-bound per risolvere il problema di CSP
@@ -60,15 +323,17 @@ class optimizationCsp:
             context (dict): Il contesto corrente
         """
 
+        if self.budgetExceeded():
+            return
+        self.stats['nodes'] += 1
         can_eval = self.evalCs(CCs, context)
         rem_Cs = CCs.copy()
         rem_Cs = removeElements(rem_Cs, can_eval)
         cost_context = self.cost(context, can_eval)
 
-        if cost_context + self.h(rem_Cs) < self.bound:
+        if cost_context + self.h(rem_Cs, context) < self.currentBound():
             if not CVs:
-                self.best_asst = context
-                self.bound = cost_context
+                self.updateBest(context, cost_context)
             else:
                 var = self.selectVariable(CVs, context)
                 for val in self.Ds[var]:
@@ -77,6 +342,8 @@ class optimizationCsp:
                     context2 = context.copy()
                     context2[var] = val
                     self.cbsearch(CVs2, rem_Cs, context2)
+        else:
+            self.stats['pruned'] += 1
     
 
     def selectVariable_default(self, CVs, context):
@@ -92,4 +359,189 @@ class optimizationCsp:
             Any: La variabile da assegnare
         """
 
-        return CVs[0]
\ No newline at end of file
+        return CVs[0]
+
+
+class bitmaskOptimizationCsp:
+    """
+    La classe bitmaskOptimizationCsp rappresenta un problema di ottimizzazione tramite CSP con variabili booleane, risolto con una
+    rappresentazione compatta del contesto. Variabili e vincoli sono associati a indici interi e gli insiemi di variabili assegnate,
+    di variabili vere, di variabili rimanenti e di vincoli rimanenti sono rappresentati da interi usati come insiemi di bit.
+    Il contesto viene convertito in dizionario solo quando viene restituita la migliore assegnazione.
+
+    Attributes:
+        variables (list): Lista delle variabili del problema, il bit i corrisponde a variables[i]\n
+        constraints (list): Lista dei vincoli del problema, il bit i corrisponde a constraints[i]\n
+        cost_function (function): Funzione cost(assigned, true, can_eval) che calcola il costo del contesto in base ai vincoli valutabili\n
+        heuristic_function (function): Funzione h(rem_Cs, assigned, true) che restituisce l'euristica sulla base dei vincoli non ancora soddisfatti. Deve essere un limite inferiore del costo ancora da aggiungere\n
+        evaluableConstraints_function (function): Funzione evalCs(CCs, assigned, true) che restituisce l'insieme dei vincoli valutabili\n
+        selectVariable_function (function): Funzione selectVariable(CVs, assigned, true) che restituisce l'indice della variabile da assegnare. Se non specificata, viene selezionata la variabile rimanente con indice minore\n
+        bound (float): Limite superiore del costo del contesto\n
+        incumbent (Value): Valore condiviso tra processi (multiprocessing.Value) con il costo della migliore soluzione trovata globalmente\n
+        verbose (bool): Se True vengono stampati i messaggi di inizio e fine risoluzione\n
+        onSolution (function): Funzione onSolution(asst, cost) chiamata ogni volta che viene trovata un'assegnazione migliore\n
+        timeLimit (float): Tempo massimo in secondi della ricerca\n
+        maxNodes (int): Numero massimo di nodi da esplorare
+    """
+
+    __all__ = ['solve']
+
+
+    def __init__(self, variables, constraints, cost_function, heuristic_function, evaluableConstraints_function, selectVariable_function=None, bound=float('inf'), incumbent=None, verbose=True, onSolution=None, timeLimit=None, maxNodes=None):
+        self.Vs = variables
+        self.Cs = constraints
+        self.cost = cost_function
+        self.h = heuristic_function
+        self.evalCs = evaluableConstraints_function
+        self.bound = bound
+        self.best_asst = None
+        self.best_mask = None
+        self.stats = {'nodes': 0, 'pruned': 0, 'solutions': 0}
+        self.incumbent = incumbent
+        self.verbose = verbose
+        self.onSolution = onSolution
+        self.timeLimit = timeLimit
+        self.maxNodes = maxNodes
+        self.deadline = None
+        self.stopped = False
+        self.finished = False
+        if selectVariable_function is None:
+            self.selectVariable = self.selectVariable_default
+        else:
+            self.selectVariable = selectVariable_function
+
+
+    def solve(self, context=None):
+        """
+        Funzione di risoluzione del problema di CSP.
+        Restituisce la migliore assegnazione delle variabili del problema.
+
+        Parametri:
+            context (Dict): assegnazione parziale da cui far partire la ricerca. Se None la ricerca parte dal contesto vuoto
+
+        Returns:
+            Dict: La migliore assegnazione delle variabili del problema
+        """
+
+        if self.verbose:
+            print("Inizio risoluzione CSP...")
+        self.startBudget()
+        self.stats = {'nodes': 0, 'pruned': 0, 'solutions': 0}
+        self.best_mask = None
+        self.best_asst = None
+        assigned = 0
+        true = 0
+        for i, var in enumerate(self.Vs):
+            if context is not None and var in context:
+                assigned |= 1 << i
+                if context[var]:
+                    true |= 1 << i
+        allVs = ((1 << len(self.Vs)) - 1) & ~assigned
+        allCs = (1 << len(self.Cs)) - 1
+        self.cbsearch(allVs, allCs, assigned, true)
+        self.finished = not self.stopped
+        if self.verbose:
+            print(f"Fine risoluzione CSP: {self.stats['nodes']} nodi esplorati, {self.stats['pruned']} potati")
+
+        if self.best_mask is not None:
+            self.best_asst = self.maskToAsst(self.best_mask)
+        return self.best_asst
+
+
+    def maskToAsst(self, mask):
+        """
+        Funzione che converte l'insieme delle variabili vere nell'assegnazione in forma di dizionario
+
+        Parametri:
+            mask (int): Insieme delle variabili assegnate a True
+
+        Returns:
+            Dict: L'assegnazione delle variabili
+        """
+
+        return {var: bool(mask >> i & 1) for i, var in enumerate(self.Vs)}
+
+
+    def startBudget(self):
+        """
+        Metodo che inizializza il limite di tempo e di nodi della ricerca
+        """
+
+        self.stopped = False
+        self.finished = False
+        self.deadline = None if self.timeLimit is None else time.monotonic() + self.timeLimit
+
+
+    def budgetExceeded(self):
+        """
+        Funzione che verifica se la ricerca ha superato il limite di tempo o di nodi. Una volta superato, la ricerca resta ferma
+
+        Returns:
+            Bool: True se la ricerca deve fermarsi, False altrimenti
+        """
+
+        if not self.stopped:
+            if self.maxNodes is not None and self.stats['nodes'] >= self.maxNodes:
+                self.stopped = True
+            elif self.deadline is not None and time.monotonic() >= self.deadline:
+                self.stopped = True
+        return self.stopped
+
+
+    def cbsearch(self, CVs, CCs, assigned, true):
+        """
+        Metodo ricorsivo della ricerca branch-and-bound per risolvere il problema di CSP
+
+        Attributes:
+            CVs (int): Insieme delle variabili rimanenti da assegnare
+            CCs (int): Insieme dei vincoli rimanenti da soddisfare
+            assigned (int): Insieme delle variabili assegnate
+            true (int): Insieme delle variabili assegnate a True
+        """
+
+        if self.budgetExceeded():
+            return
+        self.stats['nodes'] += 1
+        can_eval = self.evalCs(CCs, assigned, true)
+        rem_Cs = CCs & ~can_eval
+        cost_context = self.cost(assigned, true, can_eval)
+
+        bound = self.bound if self.incumbent is None else min(self.bound, self.incumbent.value)
+        if cost_context + self.h(rem_Cs, assigned, true) < bound:
+            if not CVs:
+                # La migliore assegnazione resta un insieme di bit: viene convertita in dizionario solo alla fine di solve
+                # o se è richiesta dalla funzione onSolution
+                self.best_mask = true
+                self.bound = cost_context
+                self.stats['solutions'] += 1
+                if self.onSolution is not None:
+                    self.onSolution(self.maskToAsst(true), cost_context)
+                if self.incumbent is not None:
+                    with self.incumbent.get_lock():
+                        if cost_context < self.incumbent.value:
+                            self.incumbent.value = cost_context
+            else:
+                bit = 1 << self.selectVariable(CVs, assigned, true)
+                CVs2 = CVs & ~bit
+                assigned2 = assigned | bit
+                self.cbsearch(CVs2, rem_Cs, assigned2, true)
+                self.cbsearch(CVs2, rem_Cs, assigned2, true | bit)
+        else:
+            self.stats['pruned'] += 1
+
+
+    def selectVariable_default(self, CVs, assigned, true):
+        """
+        Funzione di default per la selezione della variabile da assegnare.
+        Restituisce l'indice minore tra quelli delle variabili rimanenti.
+
+        Attributes:
+            CVs (int): Insieme delle variabili rimanenti da assegnare
+            assigned (int): Insieme delle variabili assegnate
+            true (int): Insieme delle variabili assegnate a True
+
+        Returns:
+            Int: L'indice della variabile da assegnare
+        """
+
+        return (CVs & -CVs).bit_length() - 1
\ No newline at end of file
@@ -3,7 +3,10 @@ from sklearn.compose import ColumnTransformer
 from sklearn.discriminant_analysis import StandardScaler
 from sklearn.ensemble import AdaBoostClassifier, BaggingClassifier, RandomForestClassifier
 from sklearn.linear_model import LogisticRegression
-from sklearn.model_selection import GridSearchCV, RepeatedKFold, cross_val_score, learning_curve, train_test_split
+from sklearn.base import clone
+from sklearn.metrics import check_scoring, get_scorer
+from sklearn.experimental import enable_halving_search_cv
+from sklearn.model_selection import GridSearchCV, RandomizedSearchCV, HalvingGridSearchCV, HalvingRandomSearchCV, RepeatedKFold, StratifiedKFold, GroupKFold, GroupShuffleSplit, learning_curve, train_test_split
 from sklearn.neighbors import KNeighborsClassifier
 from sklearn.pipeline import Pipeline
 from sklearn.tree import DecisionTreeClassifier
@@ -11,9 +14,62 @@ from imblearn.over_sampling import SMOTE
 from imblearn.pipeline import Pipeline as ImbPipeline
 import pandas as pd
 import joblib
+from joblib import Parallel, delayed
 import matplotlib.pyplot as plt
+from functools import partial
+import tempfile
+import shutil
 import json
+import re
 import os
+from util import atomicWrite, writeJson
+
+
+def scoreFold(pipeline, X, y, train, test, scoring, sampleWeight=None):
+    """
+    Funzione che addestra il modello su un fold di training e lo valuta sul fold di test con tutte le metriche
+
+    Parametri:
+        pipeline (Pipeline): il modello da addestrare
+        X (DataFrame): il dataset senza il target
+        y (DataFrame): il target del dataset
+        train (ndarray): gli indici delle righe di training
+        test (ndarray): gli indici delle righe di test
+        scoring (List): i nomi delle metriche, valutate insieme con una sola predizione sul fold di test
+        sampleWeight (ndarray): il peso di ogni riga, usato sia nell'addestramento che nella valutazione. Se None le righe hanno lo stesso peso
+
+    Returns:
+        Dict: il valore di ogni metrica sul fold di test
+    """
+
+    X_test, y_test = X.iloc[test], y.iloc[test]
+    # Lo scorer multimetrica calcola la predizione una volta e la riusa per tutte le metriche
+    scorer = check_scoring(pipeline, scoring=scoring)
+    if sampleWeight is None:
+        pipeline.fit(X.iloc[train], y.iloc[train])
+        return scorer(pipeline, X_test, y_test)
+    pipeline.fit(X.iloc[train], y.iloc[train], model__sample_weight=sampleWeight[train])
+    return scorer(pipeline, X_test, y_test, sample_weight=sampleWeight[test])
+
+
+def weightedScore(scorer, weights, estimator, X, y):
+    """
+    Funzione che valuta un modello con una metrica pesata. Il peso di ogni riga viene letto da weights attraverso l'indice di X,
+    così la funzione può essere usata come scoring nelle ricerche dei parametri e nella learning curve, che passano solo le righe del fold
+
+    Parametri:
+        scorer (Function): la metrica, come restituita da get_scorer
+        weights (Series): il peso di ogni riga, con lo stesso indice del dataset
+        estimator (Model): il modello da valutare
+        X (DataFrame): le righe del fold di test
+        y (Series): il target delle righe del fold di test
+
+    Returns:
+        Float: il valore della metrica
+    """
+
+    return scorer(estimator, X, y, sample_weight=weights.loc[X.index].to_numpy())
+
 
 class SupervisedLearning:
     """
@@ -27,17 +83,23 @@ class SupervisedLearning:
     __all__ = ['trainModel']
 
 
-    def __init__(self, dataset, target):
+    def __init__(self, dataset, target, weighted=False, weightColumn="Count"):
         """
         Costruttore della classe. Inizializza i modelli vuoti, i parametri da testare per i modelli, il preprocessor e le metriche di valutazione
 
         Parametri:
             dataset (DataFrame): il dataset su cui effettuare l'apprendimento supervisionato
             target (String): il target del dataset
+            weighted (Bool): se True le righe con gli stessi valori vengono raggruppate in una sola riga pesata con il loro numero
+                e il dataset viene bilanciato con i pesi invece che con SMOTE
+            weightColumn (String): la colonna con il numero di ripetizioni di ogni riga, se presente nel dataset (ad esempio quello
+                restituito da FeatureStore.toDataFrame(weighted=True))
         """
 
         self.dataset = dataset
         self.target = target
+        self.weighted = weighted
+        self.weightColumn = weightColumn
 
         self.empty_models = {
             'Decision Tree': DecisionTreeClassifier(),
@@ -65,14 +127,14 @@ class SupervisedLearning:
 
         self.preprocessor = ColumnTransformer(
             transformers=[
-                ('scaler', StandardScaler(), pd.DataFrame(dataset.drop(target, axis=1)).columns)
+                ('scaler', StandardScaler(), pd.DataFrame(dataset.drop(columns=[target, weightColumn], errors='ignore')).columns)
             ]
         )
 
         self.scoring = ['accuracy', 'precision_macro', 'recall_macro', 'f1_macro']
     
 
-    def trainModel(self, savePath, bestParamsFile=None):
+    def trainModel(self, savePath, bestParamsFile=None, searchStrategy="grid", searchBudget=None):
         """
         Funzione che si occupa dell'addestramento dei modelli di classificazione DecisionTree, RandomForest e LogisticRegression.
         Ogni modello viene valutato secondo le metriche: accuracy, precision, recall e f1.
@@ -80,6 +142,8 @@ class SupervisedLearning:
         Parametri:
             savePath (String): il percorso in cui salvare i migliori parametri, i modelli e le learning curves
             bestParamsFile (String): il file json contenente i migliori parametri per i modelli. Se non specificato, vengono cercati i migliori parametri
+            searchStrategy (String): la strategia di ricerca dei migliori parametri (vedi bestParams)
+            searchBudget (Int): il numero di combinazioni da valutare per le strategie di ricerca casuali (vedi bestParams)
         
         Return:
             res (Dict): un dizionario contenente i valori delle metriche per i modelli addestrati
@@ -93,104 +157,266 @@ class SupervisedLearning:
         if not os.path.exists(learningCurvesPath):
             os.makedirs(learningCurvesPath)
 
-        # Oversampling del dataset
-        dataset = self.oversamplimg(self.dataset, self.target)
+        if self.weighted:
+            # Raggruppamento delle righe uguali e bilanciamento tramite i pesi
+            dataset = self.aggregate(self.dataset, self.target)
+            weights = self.balanceWeights(dataset[self.target], dataset[self.weightColumn])
+            dataset = dataset.drop(self.weightColumn, axis=1)
+        else:
+            # Oversampling del dataset
+            dataset = self.oversamplimg(self.dataset, self.target)
+            weights = None
 
         # Divisione del dataset in training e test set
         X = dataset.drop(self.target, axis=1)
         y = dataset[self.target]
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
+        if weights is None:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2)
+            fitParams = {}
+            groups = groups_train = None
+        else:
+            # Le righe raggruppate con le stesse caratteristiche e gravità diversa formano un gruppo: ogni divisione del dataset
+            # (training e test, fold della cross-validation e della learning curve) mette un gruppo da una sola parte
+            groups = X.groupby(list(X.columns), sort=False).ngroup().to_numpy()
+            train, test = next(GroupShuffleSplit(n_splits=1, test_size=0.2).split(X, y, groups))
+            X_train, X_test, y_train, y_test = X.iloc[train], X.iloc[test], y.iloc[train], y.iloc[test]
+            fitParams = {'model__sample_weight': weights[train]}
+            groups_train = groups[train]
 
         if bestParamsFile is None:
             # Ricerca dei migliori parametri per i modelli
-            best_params = self.bestParams(X_train, y_train)
+            best_params = self.bestParams(X_train, y_train, searchStrategy, searchBudget, fitParams, groups_train)
             # Salvataggio dei migliori parametri su file
             bpPath = os.path.join(savePath, 'best_params.json')
-            with open(bpPath, 'w') as file:
-                json.dump(best_params, file)
+            writeJson(bpPath, best_params)
         else:
             # Caricamento dei migliori parametri da file
             with open(bestParamsFile, 'r') as file:
                 best_params = json.load(file)
 
         # Impostazione dei modelli con i migliori parametri
-        models = {
-                'DecisionTree': DecisionTreeClassifier(
-                    criterion=best_params['Decision Tree']['criterion'],
-                    max_depth=best_params['Decision Tree']['max_depth'],
-                    min_samples_split=best_params['Decision Tree']['min_samples_split'],
-                    min_samples_leaf=best_params['Decision Tree']['min_samples_leaf']
-                ),
-                'RandomForest': RandomForestClassifier(
-                    n_estimators=best_params['Random Forest']['n_estimators'],
-                    max_depth=best_params['Random Forest']['max_depth'],
-                    min_samples_split=best_params['Random Forest']['min_samples_split'],
-                    min_samples_leaf=best_params['Random Forest']['min_samples_leaf'],
-                    bootstrap=best_params['Random Forest']['bootstrap'],
-                    criterion=best_params['Random Forest']['criterion']
-                ),
-                'AdaBoost': AdaBoostClassifier(
-                    n_estimators=best_params['AdaBoost']['n_estimators'],
-                    learning_rate=best_params['AdaBoost']['learning_rate'],
-                    algorithm=best_params['AdaBoost']['algorithm']
-                )
-            }
+        models = self.buildModels(best_params)
         
-        cv = RepeatedKFold(n_splits=5, n_repeats=5)
-
-        res = {}
-
-        # Addestramento dei modelli: valutazione e salvataggio su file
-        for model_name, model in models.items():
-            res[model_name] = {}
+        # Piano dei fold calcolato una sola volta e condiviso da tutti i modelli
+        if groups is None:
+            folds = list(RepeatedKFold(n_splits=5, n_repeats=5).split(X, y))
+        else:
+            folds = [fold for _ in range(5) for fold in GroupKFold(n_splits=5, shuffle=True).split(X, y, groups)]
 
-            print(f"\n\nTraining {model_name} model...")
-            pipeline = ImbPipeline([
+        pipelines = {
+            model_name: ImbPipeline([
                 ('preprocessor', self.preprocessor),
                 ('model', model)
             ])
+            for model_name, model in models.items()
+        }
 
-            # Addestramento e valutazione del modello tramite k-fold cross-validation
-            for score in self.scoring:
-                scores = cross_val_score(pipeline, X, y, cv=cv, scoring=score, n_jobs=-2)
-                mean_score = np.mean(scores)
-                res[model_name][score.split("_")[0]] = mean_score
-            pipeline.fit(X_train, y_train)
+        # Valutazione dei modelli tramite k-fold cross-validation: ogni coppia (modello, fold) viene addestrata una sola volta
+        # e valutata con tutte le metriche, e le coppie vengono eseguite in parallelo
+        print(f"\n\nEvaluating {len(pipelines)} models on {len(folds)} folds...")
+        jobs = [(model_name, train, test) for model_name in pipelines for train, test in folds]
+        scores = Parallel(n_jobs=-2)(
+            delayed(scoreFold)(clone(pipelines[model_name]), X, y, train, test, self.scoring, weights) for model_name, train, test in jobs
+        )
+
+        res = {}
+        for model_name in pipelines:
+            foldScores = [score for (name, _, _), score in zip(jobs, scores) if name == model_name]
+            res[model_name] = {score.split("_")[0]: np.mean([fold[score] for fold in foldScores]) for score in self.scoring}
+
+        # Addestramento dei modelli e salvataggio su file
+        for model_name, pipeline in pipelines.items():
+            print(f"\n\nTraining {model_name} model...")
+            pipeline.fit(X_train, y_train, **fitParams)
             
             # Salvataggio del modello su file
             modelPath = os.path.join(savePath, 'models', f"{model_name}.pkl")
-            joblib.dump(pipeline, modelPath)
+            atomicWrite(modelPath, lambda tmpPath: joblib.dump(pipeline, tmpPath))
             print(f"Saved {model_name} model to {modelPath}")
         
         # Generazione delle learning curves per i modelli
         for model_name, model in models.items():
             print(f"\n\nGenerating {model_name} learning curve...")
-            self.learningCurve(model, X, y, model_name, savePath)
+            self.learningCurve(model, X, y, model_name, savePath, weights, groups)
 
         return res
     
 
-    def bestParams(self, X_train, y_train):
+    def buildModels(self, best_params):
+        """
+        Funzione che crea i modelli di classificazione con i migliori parametri
+
+        Parametri:
+            best_params (Dict): i migliori parametri di ogni modello, nel formato di best_params.json
+
+        Returns:
+            Dict: i modelli non addestrati, per nome
+        """
+
+        return {
+            'DecisionTree': DecisionTreeClassifier(
+                criterion=best_params['Decision Tree']['criterion'],
+                max_depth=best_params['Decision Tree']['max_depth'],
+                min_samples_split=best_params['Decision Tree']['min_samples_split'],
+                min_samples_leaf=best_params['Decision Tree']['min_samples_leaf']
+            ),
+            'RandomForest': RandomForestClassifier(
+                n_estimators=best_params['Random Forest']['n_estimators'],
+                max_depth=best_params['Random Forest']['max_depth'],
+                min_samples_split=best_params['Random Forest']['min_samples_split'],
+                min_samples_leaf=best_params['Random Forest']['min_samples_leaf'],
+                bootstrap=best_params['Random Forest']['bootstrap'],
+                criterion=best_params['Random Forest']['criterion']
+            ),
+            'AdaBoost': AdaBoostClassifier(
+                n_estimators=best_params['AdaBoost']['n_estimators'],
+                learning_rate=best_params['AdaBoost']['learning_rate'],
+                algorithm=best_params['AdaBoost']['algorithm']
+            )
+        }
+
+
+    def refitModels(self, savePath, bestParamsFile, modelNames=None):
+        """
+        Funzione che addestra di nuovo i modelli sul dataset raggruppato e pesato, con i parametri già trovati e senza
+        ricerca dei parametri, cross-validation e learning curves, e pubblica ogni modello in un nuovo file versionato
+        (ad esempio DecisionTree_v3.pkl). Ogni modello viene valutato addestrandolo sul training set e misurandolo sul test set,
+        divisi per gruppi di righe con le stesse caratteristiche, e poi addestrato su tutte le righe per la pubblicazione (vedi publishVersion)
+
+        Parametri:
+            savePath (String): il percorso che contiene la cartella models
+            bestParamsFile (String): il file json contenente i migliori parametri per i modelli
+            modelNames (List): i nomi dei modelli da addestrare (ad esempio ["DecisionTree"]). Se None vengono addestrati tutti
+
+        Returns:
+            Tuple: il percorso del file pubblicato per ogni modello e i valori delle metriche sul test set per ogni versione
+                pubblicata (ad esempio "DecisionTree_v3"), nel formato restituito da trainModel
+        """
+
+        with open(bestParamsFile, 'r') as file:
+            best_params = json.load(file)
+        models = self.buildModels(best_params)
+        if modelNames is not None:
+            models = {model_name: models[model_name] for model_name in modelNames}
+
+        dataset = self.aggregate(self.dataset, self.target)
+        weights = self.balanceWeights(dataset[self.target], dataset[self.weightColumn])
+        X = dataset.drop([self.target, self.weightColumn], axis=1)
+        y = dataset[self.target]
+        groups = X.groupby(list(X.columns), sort=False).ngroup().to_numpy()
+        train, test = next(GroupShuffleSplit(n_splits=1, test_size=0.2).split(X, y, groups))
+
+        modelsPath = os.path.join(savePath, 'models')
+        if not os.path.exists(modelsPath):
+            os.makedirs(modelsPath)
+
+        published = {}
+        res = {}
+        for model_name, model in models.items():
+            print(f"\n\nRefitting {model_name} model on {len(X)} aggregated rows...")
+            pipeline = ImbPipeline([
+                ('preprocessor', self.preprocessor),
+                ('model', model)
+            ])
+            scores = scoreFold(clone(pipeline), X, y, train, test, self.scoring, weights)
+            # Il modello pubblicato viene addestrato su tutte le righe, compresi i nuovi dati finiti nel test set
+            pipeline.fit(X, y, model__sample_weight=weights)
+
+            modelPath = self.publishVersion(modelsPath, model_name, pipeline)
+            version = os.path.splitext(os.path.basename(modelPath))[0]
+            published[model_name] = modelPath
+            res[version] = {score.split("_")[0]: scores[score] for score in self.scoring}
+            print(f"Published {model_name} model to {modelPath}")
+        return published, res
+
+
+    def publishVersion(self, modelsPath, model_name, pipeline):
+        """
+        Funzione che pubblica un modello come versione successiva all'ultima pubblicata. Il modello viene scritto in un file
+        temporaneo nella cartella dei modelli e collegato al nome della versione con os.link, che fallisce se il file esiste già:
+        il file versionato compare solo completo e, se un altro processo ha già pubblicato la stessa versione, viene provata la seguente
+
+        Parametri:
+            modelsPath (String): la cartella dei modelli
+            model_name (String): il nome del modello
+            pipeline (Pipeline): il modello addestrato
+
+        Returns:
+            String: il percorso del file pubblicato
+        """
+
+        fd, tmpPath = tempfile.mkstemp(dir=modelsPath, prefix=f"{model_name}.", suffix=".tmp")
+        os.close(fd)
+        try:
+            joblib.dump(pipeline, tmpPath)
+            versions = [int(match.group(1)) for match in (re.fullmatch(rf"{model_name}_v(\d+)\.pkl", name) for name in os.listdir(modelsPath)) if match]
+            version = max(versions, default=0) + 1
+            while True:
+                modelPath = os.path.join(modelsPath, f"{model_name}_v{version}.pkl")
+                try:
+                    os.link(tmpPath, modelPath)
+                    return modelPath
+                except FileExistsError:
+                    version += 1
+        finally:
+            os.remove(tmpPath)
+
+
+    def bestParams(self, X_train, y_train, strategy="grid", budget=None, fitParams=None, groups=None):
         """
         Funzione che restituisce i migliori parametri per i modelli.
-        Utilizza la tecnica GridSearchCV per la ricerca dei migliori parametri
+        La ricerca viene fatta sulla pipeline completa, con la trasformazione del preprocessor salvata in cache (memory) e
+        riutilizzata da tutti i candidati che condividono lo stesso fold
 
         Parametri:
             X_train (DataFrame): il dataset di training senza il target
             y_train (DataFrame): il target del dataset di training
+            strategy (String): la strategia di ricerca: "grid" (GridSearchCV, tutte le combinazioni), "random" (RandomizedSearchCV),
+                "halving-grid" (HalvingGridSearchCV) o "halving-random" (HalvingRandomSearchCV)
+            budget (Int): il numero di combinazioni da valutare per le strategie "random" e "halving-random".
+                Se None vengono usate 20 combinazioni per "random" e quelle scelte da scikit-learn per "halving-random".
+                Le strategie "grid" e "halving-grid" valutano tutte le combinazioni e non accettano un budget
+            fitParams (Dict): i parametri passati al fit della pipeline. Se contiene model__sample_weight i pesi vengono usati
+                anche nel calcolo della metrica, come nella valutazione di trainModel
+            groups (ndarray): il gruppo di ogni riga. Se specificato le righe dello stesso gruppo restano nello stesso fold
+
+        Returns:
+            Dict: i migliori parametri di ogni modello
         """
 
+        if strategy not in ("grid", "random", "halving-grid", "halving-random"):
+            raise ValueError(f"Strategia di ricerca non valida: {strategy}")
+        if budget is not None and strategy in ("grid", "halving-grid"):
+            raise ValueError(f"La strategia {strategy} valuta tutte le combinazioni e non accetta un budget")
+
+        scoring = 'f1_macro'
+        if fitParams and 'model__sample_weight' in fitParams:
+            scoring = partial(weightedScore, get_scorer('f1_macro'), pd.Series(fitParams['model__sample_weight'], index=X_train.index))
+
+        cacheDir = tempfile.mkdtemp(prefix="bestParams_")
         values = {}
-        for model_name, model in self.empty_models.items():
-            print(f"\nSearching best params for {model_name} model...")
-            grid_search = GridSearchCV(estimator=model, param_grid=self.param_grids[model_name],
-                                        cv=5, n_jobs=-1, verbose=2, scoring='f1_macro', refit='f1_macro')
-            pipeline = Pipeline([
-                ('preprocessor', self.preprocessor),
-                ('model', grid_search)
-            ])
-            pipeline.fit(X_train, y_train)
-            values[model_name] = grid_search.best_params_
+        try:
+            for model_name, model in self.empty_models.items():
+                print(f"\nSearching best params for {model_name} model ({strategy})...")
+                pipeline = Pipeline([
+                    ('preprocessor', self.preprocessor),
+                    ('model', model)
+                ], memory=cacheDir)
+                param_grid = {f"model__{param}": values for param, values in self.param_grids[model_name].items()}
+                options = {'cv': 5 if groups is None else GroupKFold(n_splits=5), 'n_jobs': -1, 'verbose': 2, 'scoring': scoring, 'refit': False}
+                if strategy == "grid":
+                    search = GridSearchCV(pipeline, param_grid, **options)
+                elif strategy == "random":
+                    search = RandomizedSearchCV(pipeline, param_grid, n_iter=budget if budget is not None else 20, **options)
+                elif strategy == "halving-grid":
+                    search = HalvingGridSearchCV(pipeline, param_grid, **options)
+                else:
+                    search = HalvingRandomSearchCV(pipeline, param_grid, n_candidates=budget if budget is not None else "exhaust", **options)
+                search.fit(X_train, y_train, groups=groups, **(fitParams or {}))
+                # Rimozione del prefisso model__ per mantenere il formato di best_params.json
+                values[model_name] = {param[len("model__"):]: value for param, value in search.best_params_.items()}
+        finally:
+            shutil.rmtree(cacheDir, ignore_errors=True)
         return values
     
 
@@ -212,7 +438,44 @@ class SupervisedLearning:
         return dataset_resampled
 
 
-    def learningCurve(self, model, X, y, model_name, savePath):
+    def aggregate(self, dataset, target):
+        """
+        Funzione che raggruppa le righe con gli stessi valori in una sola riga, con il numero di ripetizioni nella colonna dei pesi.
+        Se il dataset ha già la colonna dei pesi, i pesi delle righe uguali vengono sommati
+
+        Parametri:
+            dataset (DataFrame): il dataset da raggruppare
+            target (String): il target del dataset
+
+        Returns:
+            DataFrame: il dataset raggruppato, con la colonna dei pesi
+        """
+
+        columns = [column for column in dataset.columns if column != self.weightColumn]
+        if self.weightColumn in dataset.columns:
+            return dataset.groupby(columns, as_index=False, sort=False)[self.weightColumn].sum()
+        return dataset.groupby(columns, as_index=False, sort=False).size().rename(columns={'size': self.weightColumn})
+
+
+    def balanceWeights(self, y, counts):
+        """
+        Funzione che calcola il peso di ogni riga del dataset raggruppato, in modo che tutte le classi del target abbiano lo stesso
+        peso totale, come dopo l'oversampling
+
+        Parametri:
+            y (Series): il target di ogni riga
+            counts (Series): il numero di ripetizioni di ogni riga
+
+        Returns:
+            ndarray: il peso di ogni riga
+        """
+
+        classTotals = counts.groupby(y).sum()
+        classWeights = counts.sum() / (len(classTotals) * classTotals)
+        return (counts * y.map(classWeights)).to_numpy(dtype=float)
+
+
+    def learningCurve(self, model, X, y, model_name, savePath, sampleWeight=None, groups=None):
         """
         Funzione che genera la learning curve per il modello passato come parametro.
         Salva il grafico su file
@@ -222,6 +485,8 @@ class SupervisedLearning:
             X (DataFrame): il dataset senza il target
             y (DataFrame): il target del dataset
             model_name (String): il nome del modello
+            sampleWeight (ndarray): il peso di ogni riga, usato nell'addestramento e nel calcolo dell'accuratezza. Se None le righe hanno lo stesso peso
+            groups (ndarray): il gruppo di ogni riga. Se specificato le righe dello stesso gruppo restano nello stesso fold
         """
 
         # Generazione della learning curve
@@ -229,10 +494,15 @@ class SupervisedLearning:
             estimator=model,
             X=X,
             y=y,
-            cv=5,
+            groups=groups,
+            # Fold e sottoinsiemi di training estratti da righe mescolate, indipendentemente dall'ordine del dataset
+            cv=StratifiedKFold(n_splits=5, shuffle=True, random_state=0) if groups is None else GroupKFold(n_splits=5, shuffle=True, random_state=0),
+            shuffle=True,
+            random_state=0,
             n_jobs=-1,
             train_sizes=np.linspace(0.1, 1.0, 10),
-            scoring='accuracy'
+            scoring='accuracy' if sampleWeight is None else partial(weightedScore, get_scorer('accuracy'), pd.Series(sampleWeight, index=X.index)),
+            **({} if sampleWeight is None else {'params': {'sample_weight': sampleWeight}})
         )
 
         # Calcolo delle medie e delle deviazioni standard dei punteggi di training e test
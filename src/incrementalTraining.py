@@ -0,0 +1,62 @@
+from featureStore import FeatureStore
+from icon.learning import SupervisedLearning as SL
+from modelRegistry import ModelRegistry
+from util import getBasePath
+import pandas as pd
+import argparse
+import hashlib
+import os
+
+
+def updateModels(newData=None, paths=None, modelNames=None, learningPath=None, featureStore=None, force=False):
+    """
+    Funzione che aggiorna i modelli di apprendimento con nuovi dati sui crimini senza ripetere l'addestramento completo.
+    I nuovi dati vengono aggiunti ai conteggi del feature store, i modelli vengono addestrati di nuovo sulle righe raggruppate
+    e pesate con i parametri di best_params.json e pubblicati come nuove versioni in /learning/models.
+    Le metriche di ogni versione sul test set vengono salvate in metrics_values.json con il nome della versione
+
+    Parametri:
+        newData (DataFrame): le nuove righe dei crimini già sistemate, con le colonne Community Area, Week, Day, Time Slot e Severity
+        paths (List): i nuovi file csv dei crimini. Se newData e paths sono None vengono aggiunti i file /dataset/chicagoCrimes*.csv
+            non ancora elaborati
+        modelNames (List): i nomi dei modelli da aggiornare (ad esempio ["DecisionTree"]). Se None vengono aggiornati tutti
+        learningPath (String): la cartella dei risultati dell'apprendimento. Se None viene usata /learning
+        featureStore (FeatureStore): il feature store da aggiornare. Se None viene usato quello in /dataset/featureStore
+        force (Bool): se True i modelli vengono aggiornati anche se non sono stati aggiunti nuovi crimini
+
+    Returns:
+        Dict: il percorso del file pubblicato per ogni modello, vuoto se non sono stati aggiunti nuovi crimini
+    """
+
+    if learningPath is None:
+        learningPath = os.path.join(getBasePath(), "learning")
+    if featureStore is None:
+        featureStore = FeatureStore()
+
+    added = False
+    if newData is not None:
+        # Le righe già aggiunte non vengono contate due volte: la sorgente è identificata dall'hash del contenuto
+        source = hashlib.sha256(pd.util.hash_pandas_object(newData, index=False).to_numpy().tobytes()).hexdigest()
+        added = featureStore.ingestFrame(newData, source)
+    if paths is not None or newData is None:
+        added = featureStore.ingest(paths) > 0 or added
+    if not added and not force:
+        print("Nessun nuovo crimine: i modelli non vengono aggiornati")
+        return {}
+
+    supervisedLearning = SL(featureStore.toDataFrame(weighted=True), "Severity", weighted=True)
+    published, res = supervisedLearning.refitModels(learningPath, os.path.join(learningPath, "best_params.json"), modelNames)
+    ModelRegistry(learningPath).saveMetrics(res)
+    return published
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Aggiornamento dei modelli di apprendimento con nuovi dati sui crimini")
+    parser.add_argument("--files", nargs="*", default=None, help="nuovi file csv dei crimini (di default quelli in /dataset non ancora elaborati)")
+    parser.add_argument("--models", default=None, help="modelli da aggiornare, ad esempio DecisionTree,RandomForest (di default tutti)")
+    parser.add_argument("--force", action="store_true", help="aggiorna i modelli anche se non ci sono nuovi crimini")
+    args = parser.parse_args()
+
+    published = updateModels(paths=args.files, modelNames=args.models.split(",") if args.models else None, force=args.force)
+    for modelName, modelPath in published.items():
+        print(f"{modelName}: {modelPath}")
@@ -1,15 +1,16 @@
-from cleanDataset import cleanChicagoAreas, cleanChicagoCrimes
+from cleanDataset import cleanChicagoAreas
+from featureStore import FeatureStore
 from PrologKB import KB
 from patrolArrangement import PatrolArrangement as PA
 from icon.learning import SupervisedLearning as SL
+from modelRegistry import registry
 from util import printSolution, printResults, getBasePath
 import os
 
 
 if __name__ == "__main__":
-    # Percorso contenente i modelli di apprendimento utilizzabili
-    modelsPath = os.path.join(getBasePath(), "learning", "models")
-    models = os.listdir(modelsPath)
+    # Modelli di apprendimento utilizzabili, presenti nel percorso /learning/models
+    models = registry.listModels()
 
     # Pulizia del dataset delle aree di Chicago
     chicagoAreasDf = cleanChicagoAreas()
@@ -27,13 +28,32 @@ if __name__ == "__main__":
     
     if choice == 1:
         print("\n--- Apprendimento supervisionato ---\n\n")
-        # Pulizia del dataset dei crimini di Chicago
-        chicagoCrimesDf = cleanChicagoCrimes()
+        # Aggiornamento del feature store con i dataset dei crimini di Chicago non ancora elaborati e lettura del dataset
+        featureStore = FeatureStore()
+        featureStore.ingest()
+        # Scelta tra addestramento su tutte le righe (con oversampling) e addestramento sulle righe raggruppate e pesate
+        print("Addestrare sulle righe raggruppate e pesate invece che su tutte le righe? (s/n):", end=" ")
+        weighted = input().strip().lower() == "s"
+        # Scelta della strategia di ricerca dei migliori parametri e, per le strategie casuali, del numero di combinazioni da valutare
+        strategies = ["grid", "random", "halving-grid", "halving-random"]
+        while True:
+            print("Strategia di ricerca dei parametri (" + ", ".join(strategies) + ", invio per grid):", end=" ")
+            searchStrategy = input().strip() or "grid"
+            if searchStrategy in strategies:
+                break
+            print("Scelta non valida\n")
+        searchBudget = None
+        if searchStrategy in ("random", "halving-random"):
+            print("Numero di combinazioni da valutare (invio per il valore predefinito):", end=" ")
+            value = input().strip()
+            searchBudget = int(value) if value else None
+        chicagoCrimesDf = featureStore.toDataFrame(weighted=weighted)
         # Apprendimento supervisionato per la previsione della gravità dei crimini
-        supervisedLearning = SL(chicagoCrimesDf, "Severity")
+        supervisedLearning = SL(chicagoCrimesDf, "Severity", weighted=weighted)
         # Se come parametro si passa il json con i parametri verrano usati invece che cercati
-        res = supervisedLearning.trainModel(os.path.join(getBasePath(), "learning"))
+        res = supervisedLearning.trainModel(os.path.join(getBasePath(), "learning"), searchStrategy=searchStrategy, searchBudget=searchBudget)
         printResults(res)
+        registry.saveMetrics(res)
         print("\nApprendimento supervisionato completato")
     
     # Disposizione delle pattuglie
@@ -41,10 +61,10 @@ if __name__ == "__main__":
     # scelta del modello di apprendimento da utilizzare. Vengono proposti i modelli disponibili nel percorso /learning/models
     while True:
         print("Scegli il modello di apprendimento da utilizzare:")
-        modelsPath = os.path.join(getBasePath(), "learning", "models")
-        models = os.listdir(modelsPath)
+        models = registry.listModels()
         for i, model in enumerate(models):
-            print(f"{i+1}. {model}")
+            metrics = registry.getMetadata(model, load=False)['metrics']
+            print(f"{i+1}. {model}" + (f" (accuracy: {metrics['accuracy']:.3f}, f1: {metrics['f1']:.3f})" if metrics else ""))
         print("\nModello scelto:", end=" ")
         choice = int(input())
         if choice < 1 or choice > len(models):
@@ -60,7 +80,7 @@ if __name__ == "__main__":
     hour = int(input())
     print("\n")
     # Creazione della base di conoscenza
-    kb = KB(chicagoAreasDf, os.path.join(getBasePath(), "learning", "models", "DecisionTree.pkl"), week, day, hour)
+    kb = KB(chicagoAreasDf, registry.getPath(models[choice-1]), week, day, hour)
     # Problema di ottimizzazione per la ricerca della disposizione
     pa = PA(kb)
     sol = pa.findBestArrangement()
@@ -5,10 +5,15 @@
 :- dynamic(severity/2).
 :- dynamic(nearAreas/2).
 :- dynamic(size/2).
+:- dynamic(hopDistance/3).
 
 % fatti
 :- dynamic(patrolArea/2).
 
+% valori derivati materializzati nella modalità compilata
+:- dynamic(compiledKB/0).
+:- dynamic(compiledAdjustedSeverity/2).
+
 
 % regola di vicinanza
 isNear(area(A1), area(A2)) :-
@@ -26,7 +31,12 @@ maxSize(S) :-
     max_list(L, S).
 
 
-% regole per la determinazione della gravità di una zona anche in base alla sua dimensione
+% regole per la determinazione della gravità di una zona anche in base alla sua dimensione.
+% Nella modalità compilata il valore viene letto dai fatti materializzati da compileKB
+adjustedSeverity(area(A), Sev) :-
+    compiledKB, !,
+    compiledAdjustedSeverity(A, Sev).
+
 adjustedSeverity(area(A), Sev) :-
     severity(area(A), Sev1),
     Sev1 =< 1, size(area(A), Size),
@@ -49,18 +59,27 @@ adjustedSeverity(area(A), Sev) :-
     Sev is Sev1.
 
 
-% regole di determinazione della distanza tra due aree
-distance(area(A1), area(A2), 0) :-
-    A1 = A2.
+% regola di determinazione della distanza tra due aree, letta dalla matrice delle distanze
+% calcolata sul grafo delle vicinanze (fatti hopDistance(A1, A2, D))
+distance(area(A1), area(A2), D) :-
+    hopDistance(A1, A2, D).
+
 
-distance(area(A1), area(A2), 1) :-
-    isNear(area(A1), area(A2)).
+% regole di riferimento per la distanza fino a 2, ricavate direttamente dai fatti nearAreas senza la matrice delle distanze.
+% Non sono usate dalle altre regole: servono a verificare i fatti hopDistance
+nearDistance(area(A1), area(A2), 0) :-
+    area(A1),
+    A2 = A1.
 
-distance(area(A1), area(A2), 2) :-
+nearDistance(area(A1), area(A2), 1) :-
+    isNear(area(A1), area(A2)),
+    A1 \= A2.
+
+nearDistance(area(A1), area(A2), 2) :-
     isNear(area(A1), area(X)),
     isNear(area(X), area(A2)),
-    not(isNear(area(A1), area(A2))),
-    not(distance(area(A1), area(A2), 0)).
+    A1 \= A2,
+    not(isNear(area(A1), area(A2))).
 
 
 % regola di determinazione delle aree raggiungibili entro una certa distanza
@@ -80,4 +99,14 @@ isConsiderable(area(A)) :-
 isSafe(area(A)) :-
     adjustedSeverity(area(A), S),
     maxDistance(area(A), area(AreaP), 2 - S),
-    patrolArea(area(AreaP), true).
\ No newline at end of file
+    patrolArea(area(AreaP), true).
+
+
+% regola di materializzazione dei valori derivati statici: la gravità corretta di ogni area viene calcolata una sola volta
+% con le regole precedenti e salvata come fatto indicizzato sul numero dell'area
+compileKB :-
+    retractall(compiledKB),
+    retractall(compiledAdjustedSeverity(_, _)),
+    forall(area(A),
+        (once(adjustedSeverity(area(A), Sev)), assertz(compiledAdjustedSeverity(A, Sev)))),
+    assertz(compiledKB).
\ No newline at end of file
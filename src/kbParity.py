@@ -0,0 +1,144 @@
+from cleanDataset import cleanChicagoAreas
+from PrologKB import KB
+from NumpyKB import NumpyKB
+from modelRegistry import registry
+import argparse
+import random
+
+
+def checkParity(prologKB, numpyKB, rng, steps):
+    """
+    Funzione che confronta le risposte delle due basi di conoscenza sullo stato corrente e dopo una sequenza casuale
+    di assegnazioni e rimozioni di pattuglie. Le distanze fino a 2 vengono confrontate con quelle della regola di riferimento
+    nearDistance/3, che le ricava dai fatti nearAreas: la regola distance/3 e la classe NumpyKB usano invece la stessa matrice
+    delle distanze e non possono essere verificate l'una con l'altra
+
+    Parametri:
+        prologKB (KB): la base di conoscenza in prolog
+        numpyKB (NumpyKB): la base di conoscenza con array NumPy
+        rng (Random): il generatore di numeri casuali
+        steps (Int): il numero di modifiche casuali dello stato delle pattuglie
+
+    Returns:
+        List: la lista delle differenze trovate, vuota se le due basi di conoscenza sono equivalenti
+    """
+
+    errors = []
+
+    def compare(name, a, b):
+        if a != b:
+            errors.append(f"{name}: prolog={a} numpy={b}")
+
+    areas = prologKB.getAreasList()
+    compare("getAreasList", sorted(areas), sorted(numpyKB.getAreasList()))
+    compare("getAllSeverities", prologKB.getAllSeverities(), numpyKB.getAllSeverities())
+    compare("getAllAdjustedSeverities", prologKB.getAllAdjustedSeverities(), numpyKB.getAllAdjustedSeverities())
+    for area in areas:
+        compare(f"getAreaSeverity({area})", prologKB.getAreaSeverity(area), numpyKB.getAreaSeverity(area))
+        compare(f"getAreaAdjustedSeverity({area})", prologKB.getAreaAdjustedSeverity(area), numpyKB.getAreaAdjustedSeverity(area))
+    within = {area: set() for area in areas}
+    for distance in range(3):
+        reference = prologKB.getReferenceAreasByDistance(distance)
+        byDistance = prologKB.getAllAreasByDistance(distance)
+        for area in areas:
+            within[area] |= reference[area]
+            compare(f"distance/3 di {area} a distanza {distance}", sorted(reference[area]), sorted(byDistance[area]))
+            compare(f"getAreasByDistance({area}, {distance})", sorted(reference[area]), sorted(numpyKB.getAreasByDistance(area, distance)))
+            compare(f"getAreasWithinDistance({area}, {distance})", sorted(within[area]), sorted(numpyKB.getAreasWithinDistance(area, distance)))
+
+    prologKB.clearPatrols()
+    numpyKB.clearPatrols()
+    for step in range(steps):
+        area = rng.choice(areas)
+        if rng.random() < 0.2:
+            prologKB.removeAreaPatrol(area)
+            numpyKB.removeAreaPatrol(area)
+        else:
+            patrol = rng.random() < 0.3
+            prologKB.setAreaPatrol(area, patrol)
+            numpyKB.setAreaPatrol(area, patrol)
+
+        checked = rng.sample(areas, min(10, len(areas)))
+        for area in checked:
+            compare(f"isAreaSafe({area}) al passo {step}", bool(prologKB.isAreaSafe(area)), bool(numpyKB.isAreaSafe(area)))
+            compare(f"isAreaConsiderable({area}) al passo {step}", prologKB.isAreaConsiderable(area), numpyKB.isAreaConsiderable(area))
+        compare(f"getSafeAreas al passo {step}", prologKB.getSafeAreas(), numpyKB.getSafeAreas())
+        compare(f"getConsiderableAreas al passo {step}", prologKB.getConsiderableAreas(checked), numpyKB.getConsiderableAreas(checked))
+        compare(f"evaluableAreas al passo {step}", prologKB.evaluableAreas(checked), numpyKB.evaluableAreas(checked))
+
+    return errors
+
+
+
+def runParity(areasGdf, modelPath, slots, severities, steps, seed, compiled=True):
+    """
+    Funzione che costruisce le due basi di conoscenza e le confronta su fasce orarie e gravità casuali
+
+    Parametri:
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+        modelPath (String): il percorso del modello. Se None le basi di conoscenza partono da una gravità casuale
+            e vengono verificate solo le gravità casuali
+        slots (Int): il numero di fasce orarie casuali da verificare
+        severities (Int): il numero di vettori di gravità casuali da verificare
+        steps (Int): il numero di modifiche casuali dello stato delle pattuglie per ogni verifica
+        seed (Int): il seme del generatore di numeri casuali
+        compiled (Bool): la modalità della base di conoscenza in prolog (vedi KB)
+
+    Returns:
+        List: la lista delle differenze trovate
+    """
+
+    rng = random.Random(seed)
+    initial = None if modelPath is not None else {int(area): rng.randint(0, 2) for area in areasGdf['AreaNumber']}
+    prologKB = KB(areasGdf, modelPath, 1, 1, 0, compiled=compiled, severities=initial)
+    numpyKB = NumpyKB(areasGdf, modelPath, 1, 1, 0, severities=initial)
+
+    errors = []
+    try:
+        # Fasce orarie casuali, con la gravità prevista dal modello
+        if modelPath is not None:
+            for i in range(slots):
+                week, day, hour = rng.randint(1, 53), rng.randint(0, 6), rng.randint(0, 23)
+                prologKB.setSlot(week, day, hour)
+                numpyKB.setSlot(week, day, hour)
+                errors += checkParity(prologKB, numpyKB, rng, steps)
+        # Gravità casuali, per coprire anche le combinazioni che il modello non prevede
+        for i in range(severities):
+            values = {area: rng.randint(0, 2) for area in prologKB.getAreasList()}
+            prologKB.setSeverities(values)
+            numpyKB.setSeverities(values)
+            errors += checkParity(prologKB, numpyKB, rng, steps)
+    finally:
+        prologKB.close()
+    return errors
+
+
+if __name__ == "__main__":
+    models = registry.listModels()
+    parser = argparse.ArgumentParser(description="Verifica casuale dell'equivalenza tra la base di conoscenza in prolog e quella con array NumPy")
+    parser.add_argument("--model", default=models[0] if models else None,
+                        help="nome del modello presente in /learning/models (di default il primo in ordine alfabetico)")
+    parser.add_argument("--no-model", action="store_true",
+                        help="verifica solo le gravità casuali, senza usare un modello (anche quando non ci sono modelli)")
+    parser.add_argument("--slots", type=int, default=5, help="numero di fasce orarie casuali da verificare")
+    parser.add_argument("--severities", type=int, default=5, help="numero di vettori di gravità casuali da verificare")
+    parser.add_argument("--steps", type=int, default=200, help="numero di modifiche casuali dello stato delle pattuglie per ogni verifica")
+    parser.add_argument("--seed", type=int, default=0, help="seme del generatore di numeri casuali")
+    args = parser.parse_args()
+
+    chicagoAreasDf = cleanChicagoAreas()
+    modelPath = None if args.no_model or args.model is None else registry.getPath(args.model)
+    if modelPath is None:
+        print("Nessun modello: vengono verificate solo le gravità casuali")
+
+    errors = []
+    # Le regole della gravità corretta vengono verificate sia materializzate come fatti che calcolate ad ogni interrogazione
+    for compiled in (True, False):
+        errors += [f"compiled={compiled} {error}" for error in runParity(chicagoAreasDf, modelPath, args.slots, args.severities,
+                                                                            args.steps, args.seed, compiled)]
+
+    for error in errors:
+        print(error)
+    print(f"\n{len(errors)} differenze trovate")
+    if errors:
+        raise SystemExit(1)
@@ -0,0 +1,24 @@
+def createKB(areasGdf, modelPath, week, day, timeslot, backend="prolog"):
+    """
+    Funzione che crea la base di conoscenza con il backend specificato.
+    I moduli dei backend vengono importati solo quando servono, così il backend numpy può essere usato anche senza pyswip
+
+    Parametri:
+        areasGdf (GeoDataFrame): un GeoDataFrame contenente le aree di Chicago con il loro perimetro
+        modelPath (String): Il percorso del modello di machine learning addestrato per la previsione della gravità dei crimini
+        week (Int): la settimana in cui si vuole effettuare la previsione
+        day (Int): il giorno della settimana in cui si vuole effettuare la previsione
+        timeslot (int): la fascia oraria in cui si vuole effettuare la previsione
+        backend (String): "prolog" per la base di conoscenza in prolog, "numpy" per quella con array NumPy
+
+    Returns:
+        KB: la base di conoscenza
+    """
+
+    if backend == "prolog":
+        from PrologKB import KB
+        return KB(areasGdf, modelPath, week, day, timeslot)
+    if backend == "numpy":
+        from NumpyKB import NumpyKB
+        return NumpyKB(areasGdf, modelPath, week, day, timeslot)
+    raise ValueError(f"Backend della base di conoscenza non valido: {backend}")
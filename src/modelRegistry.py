@@ -0,0 +1,187 @@
+from collections import OrderedDict
+from util import getBasePath, writeJson
+import joblib
+import json
+import re
+import os
+
+
+class ModelRegistry:
+    """
+    Classe che gestisce i modelli di apprendimento salvati in /learning/models.
+    Per ogni modello fornisce i metadati (metriche da metrics_values.json, parametri da best_params.json, colonne usate in input)
+    e lo carica solo alla prima richiesta con joblib.load(mmap_mode="r"). I modelli caricati sono tenuti in memoria con politica LRU,
+    così nei processi che restano attivi a lungo il cambio di modello o di fascia oraria non li deserializza di nuovo
+
+    Attributi:
+        learningPath (String): la cartella dei risultati dell'apprendimento, che contiene la cartella models
+        maxLoaded (Int): il numero massimo di modelli tenuti in memoria
+    """
+
+    __all__ = ['listModels', 'getPath', 'getModel', 'getMetadata', 'saveMetrics']
+
+
+    def __init__(self, learningPath=None, maxLoaded=4):
+        """
+        Costruttore della classe
+
+        Parametri:
+            learningPath (String): la cartella dei risultati dell'apprendimento. Se None viene usata /learning
+            maxLoaded (Int): il numero massimo di modelli tenuti in memoria
+        """
+
+        if learningPath is None:
+            learningPath = os.path.join(getBasePath(), "learning")
+        self.learningPath = learningPath
+        self.modelsPath = os.path.join(learningPath, "models")
+        self.maxLoaded = maxLoaded
+        # Modelli caricati (percorso -> (data di modifica, modello))
+        self.loaded = OrderedDict()
+
+
+    def listModels(self):
+        """
+        Funzione che restituisce i nomi dei modelli disponibili
+
+        Returns:
+            List: i nomi dei file .pkl presenti nella cartella dei modelli, in ordine alfabetico
+        """
+
+        if not os.path.exists(self.modelsPath):
+            return []
+        return sorted(name for name in os.listdir(self.modelsPath) if name.endswith(".pkl"))
+
+
+    def getPath(self, name):
+        """
+        Funzione che restituisce il percorso di un modello
+
+        Parametri:
+            name (String): il nome del modello, con o senza estensione .pkl
+
+        Returns:
+            String: il percorso del modello
+        """
+
+        if not name.endswith(".pkl"):
+            name = f"{name}.pkl"
+        return os.path.join(self.modelsPath, name)
+
+
+    def getModel(self, name):
+        """
+        Funzione che restituisce un modello, caricandolo dal file solo se non è già in memoria o se il file è cambiato
+
+        Parametri:
+            name (String): il nome o il percorso del modello
+
+        Returns:
+            Pipeline: il modello di apprendimento
+        """
+
+        path = name if os.path.exists(name) else self.getPath(name)
+        mtime = os.path.getmtime(path)
+        if path in self.loaded and self.loaded[path][0] == mtime:
+            self.loaded.move_to_end(path)
+            return self.loaded[path][1]
+
+        model = joblib.load(path, mmap_mode="r")
+        self.loaded[path] = (mtime, model)
+        self.loaded.move_to_end(path)
+        while len(self.loaded) > self.maxLoaded:
+            self.loaded.popitem(last=False)
+        return model
+
+
+    def getMetadata(self, name, load=True):
+        """
+        Funzione che restituisce i metadati di un modello. Le colonne usate in input vengono salvate in un file
+        <modello>.meta.json accanto al modello, così vengono lette senza caricarlo
+
+        Parametri:
+            name (String): il nome del modello
+            load (Bool): se False il modello non viene caricato per leggere le colonne in input, che valgono None se non già salvate
+
+        Returns:
+            Dict: il nome, il percorso, la dimensione del file, le metriche, i parametri e le colonne in input del modello
+        """
+
+        path = self.getPath(name)
+        modelName = os.path.splitext(os.path.basename(path))[0]
+        metaPath = os.path.splitext(path)[0] + ".meta.json"
+        if os.path.exists(metaPath) and os.path.getmtime(metaPath) >= os.path.getmtime(path):
+            with open(metaPath, 'r') as file:
+                features = json.load(file)['features']
+        elif not load:
+            features = None
+        else:
+            model = self.getModel(path)
+            features = [str(feature) for feature in getattr(model, 'feature_names_in_', [])]
+            writeJson(metaPath, {'features': features})
+
+        # Le metriche usano il nome del file del modello, i parametri il nome con gli spazi (ad esempio "Decision Tree")
+        # e valgono per tutte le versioni pubblicate da refitModels (ad esempio DecisionTree_v3)
+        metrics = self.readJson("metrics_values.json").get(modelName)
+        baseName = re.sub(r"_v\d+$", "", modelName)
+        params = None
+        for key, value in self.readJson("best_params.json").items():
+            if key.replace(" ", "") == baseName:
+                params = value
+
+        return {
+            'name': modelName,
+            'path': path,
+            'size': os.path.getsize(path),
+            'metrics': metrics,
+            'params': params,
+            'features': features
+        }
+
+
+    def readJson(self, fileName):
+        """
+        Funzione che legge un file json della cartella dei risultati dell'apprendimento
+
+        Parametri:
+            fileName (String): il nome del file
+
+        Returns:
+            Dict: il contenuto del file, vuoto se il file non esiste
+        """
+
+        path = os.path.join(self.learningPath, fileName)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as file:
+            return json.load(file)
+
+
+    def saveMetrics(self, results):
+        """
+        Metodo che salva in metrics_values.json le metriche dei modelli addestrati, mantenendo quelle degli altri modelli
+
+        Parametri:
+            results (Dict): le metriche di ogni modello, come restituite da SupervisedLearning.trainModel
+        """
+
+        metrics = self.readJson("metrics_values.json")
+        metrics.update({name: {metric: float(value) for metric, value in values.items()} for name, values in results.items()})
+        writeJson(os.path.join(self.learningPath, "metrics_values.json"), metrics, indent=4)
+
+
+# Registro condiviso dai moduli del progetto
+registry = ModelRegistry()
+
+
+def loadModel(modelPath):
+    """
+    Funzione che carica un modello attraverso il registro condiviso
+
+    Parametri:
+        modelPath (String): il percorso del modello
+
+    Returns:
+        Pipeline: il modello di apprendimento
+    """
+
+    return registry.getModel(modelPath)
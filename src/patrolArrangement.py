@@ -1,4 +1,57 @@
-from icon.csp import optimizationCsp
+from icon.csp import optimizationCsp, bitmaskOptimizationCsp
+from scipy.optimize import milp, LinearConstraint, Bounds
+from util import iterBits
+import numpy as np
+import multiprocessing
+import math
+
+
+# Versione del risolutore, usata nella chiave della cache delle soluzioni
+SOLVER_VERSION = "1"
+
+# Stato dei processi usati dalla risoluzione parallela
+workerState = {}
+
+
+def initWorker(kbClass, kbConfig, options, incumbent):
+    """
+    Funzione di inizializzazione dei processi della risoluzione parallela: costruisce la knowledge base del processo.
+    Il pool di processi resta attivo tra una risoluzione e l'altra, la gravità delle aree viene passata con ogni sottoproblema
+
+    Parametri:
+        kbClass (Type): la classe della knowledge base
+        kbConfig (Tuple): i parametri del costruttore della knowledge base
+        options (Dict): le opzioni di PatrolArrangement
+        incumbent (Value): il costo della migliore soluzione condiviso tra processi
+    """
+
+    workerState['pa'] = PatrolArrangement(kbClass(*kbConfig), **options)
+    workerState['incumbent'] = incumbent
+    workerState['severities'] = None
+
+
+def solveSubproblem(task):
+    """
+    Funzione che risolve un sottoproblema nella risoluzione parallela
+
+    Parametri:
+        task (Tuple): il contesto parziale del sottoproblema, l'engine, se usare la ricerca iterativa e la gravità delle aree
+            della knowledge base del processo principale
+
+    Returns:
+        Tuple: il costo e la migliore assegnazione trovate nel sottoproblema e le statistiche della ricerca
+    """
+
+    context, engine, iterative, severities = task
+    pa = workerState['pa']
+    # La gravità viene aggiornata solo se è cambiata dall'ultimo sottoproblema risolto dal processo
+    if workerState['severities'] != severities:
+        pa.kb.setSeverities(severities)
+        workerState['severities'] = severities
+    ocsp = pa.buildCsp(engine, iterative=iterative, incumbent=workerState['incumbent'], verbose=False)
+    asst = ocsp.solve(context)
+    return ocsp.bound, asst, ocsp.stats
+
 
 class PatrolArrangement:
     """
@@ -6,40 +59,395 @@ class PatrolArrangement:
 
     Attributes:
         kb (KB): La knowledge base da utilizzare
+        incremental (Bool): se True, ad ogni nodo della ricerca vengono aggiornati solo i fatti patrolArea delle variabili modificate
+            e viene ricontrollata la valutabilità delle sole aree che le hanno nel proprio vicinato
+        lowerBound (String): il limite inferiore usato come euristica: "severity" conta le aree rimanenti con gravità 2,
+            "packing" somma il costo minimo di un insieme di vincoli rimanenti che non hanno aree candidate in comune
+        cache (SolutionCache): la cache delle disposizioni ottime già calcolate. Se None ogni problema viene risolto
     """
 
-    def __init__(self, kb):
+    def __init__(self, kb, incremental=True, lowerBound="packing", cache=None):
+        if lowerBound not in ("severity", "packing"):
+            raise ValueError(f"Limite inferiore non valido: {lowerBound}")
         self.kb = kb
+        self.incremental = incremental
+        self.lowerBound = lowerBound
+        self.cache = cache
+        # Vicinato e peso di ogni area, calcolati all'inizio di ogni ricerca
+        self.balls = {}
+        self.areaWeights = {}
+        # Aree attualmente valutabili e, per ogni area, le aree nel cui vicinato si trova (usate in modalità incrementale)
+        self.considerable = set()
+        self.dependents = {}
+        # True se l'ultima disposizione restituita è sicuramente ottima
+        self.optimal = False
+        # Problema di ottimizzazione dell'ultima ricerca
+        self.ocsp = None
+        # Pool di processi della risoluzione parallela, riusato tra le chiamate finché non viene chiamato close
+        self.pool = None
+        self.poolKey = None
+        self.incumbent = None
 
-    def findBestArrangement(self, bound=float('inf')):
+    def findBestArrangement(self, bound=float('inf'), engine="dict", iterative=False, workers=1, splitDepth=None, backend="dfbnb",
+                            greedy=False, initial=None, timeLimit=None, maxNodes=None, onSolution=None, verbose=True):
         """
         Funzione che risolve il problema di ottimizzazione tramite CSP e restituisce la miglior disposizoine delle pattuglie
 
         Parametri:
             kb (KB): la knowledge base da utilizzare
             bound (Int): il bound iniziale
+            engine (String): la rappresentazione del contesto usata dalla ricerca: "dict" (dizionario) oppure "bitmask" (insiemi di bit)
+            iterative (Bool): se True la ricerca viene eseguita senza ricorsione (solo con engine "dict").
+                Il problema resta disponibile in self.ocsp per sospendere, riprendere o salvare la ricerca
+                (self.ocsp è None se la disposizione viene dalla cache o dal backend "milp")
+            workers (Int): numero di processi da usare. Se maggiore di 1 i primi livelli dell'albero di ricerca vengono divisi
+                in sottoproblemi risolti in parallelo, ognuno con la propria knowledge base
+            splitDepth (Int): numero di livelli dell'albero da espandere per creare i sottoproblemi. Se None viene scelto in base a workers
+            backend (String): il risolutore da usare: "dfbnb" (ricerca branch-and-bound sul CSP) oppure "milp" (programmazione lineare
+                intera con scipy/HiGHS, in questo caso engine, iterative, workers e splitDepth vengono ignorati)
+            greedy (Bool): se True la ricerca parte dalla disposizione trovata con l'algoritmo greedy, usata come bound iniziale
+            initial (Dict): una disposizione nota (ad esempio quella della fascia oraria vicina) da cui far partire la ricerca,
+                usata come bound iniziale se è valida per la knowledge base corrente
+            timeLimit (Float): tempo massimo in secondi della ricerca branch-and-bound (non disponibile con workers > 1)
+            maxNodes (Int): numero massimo di nodi della ricerca branch-and-bound (non disponibile con workers > 1)
+            onSolution (Function): funzione onSolution(arrangement, cost) chiamata per ogni disposizione migliore trovata
+                (con il backend "milp" viene chiamata una sola volta con l'ottimo, non disponibile con workers > 1)
+            verbose (Bool): se True la ricerca stampa i messaggi di inizio e fine risoluzione
         
         Returns:
-            Dict: La migliore disposizione delle pattuglie
+            Dict: La migliore disposizione delle pattuglie. self.optimal indica se è sicuramente ottima, cioè se la ricerca è terminata
+        """
+
+        if backend not in ("dfbnb", "milp"):
+            raise ValueError(f"Backend non valido: {backend}")
+        if engine not in ("dict", "bitmask"):
+            raise ValueError(f"Engine non valido: {engine}")
+        if iterative and engine != "dict":
+            raise ValueError("La ricerca iterativa è disponibile solo con engine \"dict\"")
+        if backend == "dfbnb" and workers > 1 and (timeLimit is not None or maxNodes is not None or onSolution is not None):
+            raise ValueError("timeLimit, maxNodes e onSolution non sono disponibili con workers > 1")
+
+        # La ricerca dell'eventuale chiamata precedente non è più valida
+        self.ocsp = None
+        best = None
+        seeds = []
+        if greedy:
+            seeds.append(self.greedyArrangement())
+        if initial is not None:
+            seeds.append((initial, self.arrangementCost(initial)))
+        for arrangement, cost in seeds:
+            if cost < bound:
+                best, bound = arrangement, cost
+                if onSolution is not None:
+                    onSolution(dict(arrangement), cost)
+
+        if self.cache is not None:
+            key = self.cacheKey()
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.optimal = True
+                cost = self.arrangementCost(cached)
+                if cost >= bound:
+                    return best
+                if onSolution is not None:
+                    onSolution(dict(cached), cost)
+                return cached
+
+        if backend == "milp":
+            sol = self.findBestArrangementMilp(bound)
+            self.optimal = True
+            # Il risolutore MILP restituisce solo l'ottimo, che viene notificato una volta
+            if sol is not None and onSolution is not None:
+                onSolution(dict(sol), self.arrangementCost(sol))
+        elif workers > 1:
+            sol = self.findBestArrangementParallel(bound, engine, iterative, workers, splitDepth, verbose)
+            self.optimal = True
+        else:
+            self.ocsp = self.buildCsp(engine, bound, iterative, verbose=verbose, onSolution=onSolution, timeLimit=timeLimit, maxNodes=maxNodes)
+            sol = self.ocsp.solve()
+            self.optimal = self.ocsp.finished
+
+        sol = best if sol is None else sol
+        # Una disposizione trovata da una ricerca terminata è ottima e può essere riusata
+        if self.cache is not None and sol is not None and self.optimal:
+            self.cache.put(key, sol)
+        return sol
+
+
+    def cacheKey(self):
+        """
+        Funzione che restituisce la chiave della cache delle soluzioni per la knowledge base corrente
+
+        Returns:
+            String: la chiave del problema
+        """
+
+        areaList = self.kb.getAreasList()
+        severities = {area: self.kb.getAreaSeverity(area) for area in areaList}
+        nearAreas = {area: self.kb.getAreasByDistance(area, 1) for area in areaList}
+        sizes = {area: self.kb.getAreaSize(area) for area in areaList}
+        return self.cache.makeKey(severities, nearAreas, sizes, SOLVER_VERSION)
+
+
+    def anytimeArrangements(self, timeLimit=None, maxNodes=None, greedy=True, sliceNodes=100):
+        """
+        Generatore che restituisce le disposizioni via via migliori trovate dalla ricerca branch-and-bound iterativa.
+        La ricerca viene eseguita a blocchi di sliceNodes nodi: dopo ogni blocco viene restituita la nuova migliore disposizione,
+        se presente. Al termine self.optimal indica se l'ultima disposizione restituita è sicuramente ottima
+
+        Parametri:
+            timeLimit (Float): tempo massimo in secondi della ricerca
+            maxNodes (Int): numero massimo di nodi della ricerca
+            greedy (Bool): se True viene restituita per prima la disposizione greedy, usata anche come bound iniziale
+            sliceNodes (Int): numero di nodi esplorati tra due controlli delle nuove soluzioni
+
+        Returns:
+            Generator: coppie (disposizione, costo) in ordine di costo decrescente
+        """
+
+        bound = float('inf')
+        best = None
+        if greedy:
+            best, bound = self.greedyArrangement()
+            yield dict(best), bound
+
+        self.optimal = False
+        self.ocsp = self.buildCsp("dict", bound, iterative=True, timeLimit=timeLimit, maxNodes=maxNodes)
+        self.ocsp.start()
+        solutions = 0
+        while True:
+            finished = self.ocsp.resume(maxNodes=sliceNodes)
+            if self.ocsp.stats['solutions'] > solutions:
+                solutions = self.ocsp.stats['solutions']
+                yield dict(self.ocsp.best_asst), self.ocsp.bound
+            if finished or self.ocsp.stopped:
+                break
+        self.optimal = self.ocsp.finished
+
+
+    def arrangementCost(self, arrangement):
+        """
+        Funzione che calcola il costo di una disposizione completa per la knowledge base corrente
+
+        Parametri:
+            arrangement (Dict): la disposizione delle pattuglie
+
+        Returns:
+            Float: il costo della disposizione, infinito se qualche area non è sicura o non è assegnata
+        """
+
+        areaList = self.kb.getAreasList()
+        if any(area not in arrangement for area in areaList):
+            return float('inf')
+        self.initNeighbourhoods(areaList)
+        for area in areaList:
+            if not any(arrangement[nearArea] for nearArea in self.balls[area]):
+                return float('inf')
+        return sum(self.areaWeights[area] for area in areaList if arrangement[area])
+
+
+    def greedyArrangement(self):
+        """
+        Funzione che costruisce rapidamente una disposizione valida, non necessariamente ottima: finché ci sono aree non sicure
+        viene pattugliata l'area che rende sicure più aree per unità di peso
+
+        Returns:
+            Tuple: la disposizione trovata e il suo costo
         """
 
         areaList = self.kb.getAreasList()
+        self.initNeighbourhoods(areaList)
+        covers = {area: set() for area in areaList}
+        for area in areaList:
+            for nearArea in self.balls[area]:
+                covers[nearArea].add(area)
+
+        uncovered = set(areaList)
+        patrolled = set()
+        while uncovered:
+            area = max((a for a in areaList if a not in patrolled),
+                        key=lambda a: len(covers[a] & uncovered) / self.areaWeights[a])
+            patrolled.add(area)
+            uncovered -= covers[area]
+
+        arrangement = {area: area in patrolled for area in areaList}
+        return arrangement, sum(self.areaWeights[area] for area in patrolled)
+
+
+    def buildCsp(self, engine, bound=float('inf'), iterative=False, incumbent=None, verbose=True, onSolution=None, timeLimit=None, maxNodes=None):
+        """
+        Funzione che prepara i dati della ricerca e costruisce il problema di ottimizzazione
+
+        Parametri:
+            engine (String): la rappresentazione del contesto usata dalla ricerca: "dict" oppure "bitmask"
+            bound (Int): il bound iniziale
+            iterative (Bool): se True la ricerca viene eseguita senza ricorsione (solo con engine "dict")
+            incumbent (Value): il costo della migliore soluzione condiviso tra processi
+            verbose (Bool): se True la ricerca stampa i messaggi di inizio e fine risoluzione
+            onSolution (Function): funzione chiamata per ogni assegnazione migliore trovata
+            timeLimit (Float): tempo massimo in secondi della ricerca
+            maxNodes (Int): numero massimo di nodi della ricerca
+
+        Returns:
+            optimizationCsp | bitmaskOptimizationCsp: il problema di ottimizzazione
+        """
+
+        areaList = self.kb.getAreasList()
+        self.initNeighbourhoods(areaList)
+
+        if engine == "bitmask":
+            self.initMasks(areaList)
+            return bitmaskOptimizationCsp(variables=areaList,
+                                            constraints=areaList,
+                                            cost_function=self.costMask,
+                                            heuristic_function=self.hMask,
+                                            evaluableConstraints_function=self.evaluableAreasMask,
+                                            selectVariable_function=self.selectVariableMask,
+                                            bound=bound,
+                                            incumbent=incumbent,
+                                            verbose=verbose,
+                                            onSolution=onSolution,
+                                            timeLimit=timeLimit,
+                                            maxNodes=maxNodes
+            )
+
+        if self.incremental:
+            self.initPatrolState(areaList)
 
         dm = {}
         for area in areaList:
             dm[area] = [False, True]
 
-        ocsp = optimizationCsp(variables=areaList,
+        return optimizationCsp(variables=areaList,
                                 constraints=areaList,
                                 domains=dm, 
                                 cost_function=self.cost, 
                                 heuristic_function=self.h,
                                 evaluableConstraints_function=self.evaluableAreas,
                                 selectVariable_function=self.selectVariable,
-                                bound=bound
+                                bound=bound,
+                                iterative=iterative,
+                                incumbent=incumbent,
+                                verbose=verbose,
+                                onSolution=onSolution,
+                                timeLimit=timeLimit,
+                                maxNodes=maxNodes
         )
 
-        return ocsp.solve()
+
+    def findBestArrangementParallel(self, bound, engine, iterative, workers, splitDepth, verbose=True):
+        """
+        Funzione che risolve il problema di ottimizzazione dividendolo in sottoproblemi risolti da un pool di processi.
+        Ogni processo costruisce la propria knowledge base (il motore prolog è globale al processo) e il costo della migliore
+        soluzione trovata è condiviso tra i processi, così ognuno pota rispetto alla migliore soluzione globale.
+        Il pool viene creato alla prima chiamata e riusato dalle successive (ad esempio tra le fasce orarie di solveSchedule):
+        la gravità delle aree viene inviata con i sottoproblemi, così i processi usano anche quella impostata con setSeverities
+
+        Parametri:
+            bound (Int): il bound iniziale
+            engine (String): la rappresentazione del contesto usata dalla ricerca
+            iterative (Bool): se True la ricerca viene eseguita senza ricorsione
+            workers (Int): numero di processi da usare
+            splitDepth (Int): numero di livelli dell'albero da espandere per creare i sottoproblemi
+            verbose (Bool): se True vengono stampati i messaggi di inizio e fine risoluzione
+
+        Returns:
+            Dict: La migliore disposizione delle pattuglie
+        """
+
+        if splitDepth is None:
+            splitDepth = math.ceil(math.log2(workers * 4))
+
+        if verbose:
+            print("Inizio risoluzione CSP...")
+        self.ocsp = self.buildCsp("dict", bound, verbose=False)
+        subproblems = self.ocsp.split(splitDepth)
+
+        pool = self.getPool(workers)
+        self.incumbent.value = bound
+        severities = self.kb.getAllSeverities()
+        tasks = [(context, engine, iterative, severities) for context in subproblems]
+        results = pool.map(solveSubproblem, tasks, chunksize=1)
+
+        best = None
+        bestCost = float('inf')
+        for cost, asst, stats in results:
+            for key in self.ocsp.stats:
+                self.ocsp.stats[key] += stats[key]
+            if asst is not None and cost < bestCost:
+                best, bestCost = asst, cost
+        if verbose:
+            print(f"Fine risoluzione CSP: {self.ocsp.stats['nodes']} nodi esplorati, {self.ocsp.stats['pruned']} potati")
+        return best
+
+
+    def getPool(self, workers):
+        """
+        Funzione che restituisce il pool di processi della risoluzione parallela, creandolo solo se non esiste
+        o se è cambiato il numero di processi o la knowledge base
+
+        Parametri:
+            workers (Int): numero di processi da usare
+
+        Returns:
+            Pool: il pool di processi
+        """
+
+        poolKey = (workers, id(self.kb))
+        if self.pool is not None and self.poolKey == poolKey:
+            return self.pool
+
+        self.close()
+        mpContext = multiprocessing.get_context("spawn")
+        self.incumbent = mpContext.Value('d', float('inf'))
+        options = {'incremental': self.incremental, 'lowerBound': self.lowerBound}
+        self.pool = mpContext.Pool(workers, initializer=initWorker, initargs=(type(self.kb), self.kb.getConfig(), options, self.incumbent))
+        self.poolKey = poolKey
+        return self.pool
+
+
+    def close(self):
+        """
+        Metodo che termina il pool di processi della risoluzione parallela, se presente
+        """
+
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+            self.poolKey = None
+
+
+    def findBestArrangementMilp(self, bound=float('inf')):
+        """
+        Funzione che risolve il problema come programma lineare intero: una variabile binaria per ogni area (pattugliata o no),
+        un vincolo per ogni area che richiede almeno una pattuglia nel suo vicinato e come obiettivo la somma dei pesi delle pattuglie
+
+        Parametri:
+            bound (Int): il bound iniziale. Come nella ricerca branch-and-bound, viene restituita solo una disposizione con costo minore
+
+        Returns:
+            Dict: La migliore disposizione delle pattuglie
+        """
+
+        areaList = self.kb.getAreasList()
+        self.initNeighbourhoods(areaList)
+        index = {area: i for i, area in enumerate(areaList)}
+
+        weights = np.array([self.areaWeights[area] for area in areaList], dtype=float)
+        coverage = np.zeros((len(areaList), len(areaList)))
+        for i, area in enumerate(areaList):
+            for nearArea in self.balls[area]:
+                coverage[i, index[nearArea]] = 1
+
+        res = milp(c=weights,
+                    constraints=LinearConstraint(coverage, lb=1, ub=np.inf),
+                    integrality=np.ones(len(areaList)),
+                    bounds=Bounds(0, 1)
+        )
+        if not res.success or res.fun >= bound:
+            return None
+        return {area: bool(round(res.x[i])) for i, area in enumerate(areaList)}
 
 
     def cost(self, context, Cs):
@@ -56,34 +464,38 @@ class PatrolArrangement:
             Float: Il costo del contesto specificato
         """
 
-        for c in Cs:
-            if not self.kb.isAreaSafe(c):
-                return float('inf')
+        if Cs and not self.kb.getSafeAreas(Cs).issuperset(Cs):
+            return float('inf')
         
         areas = context.keys()
         cost = 0
         for area in areas:
             if context[area]:
-                if self.kb.getAreaSeverity(area) == 2:
+                severity = self.kb.getAreaSeverity(area)
+                if severity == 2:
                     cost += 1
-                elif self.kb.getAreaSeverity(area) == 1:
+                elif severity == 1:
                     cost += 2
                 else:
                     cost += 3
         return cost
 
 
-    def h(self, Cs):
+    def h(self, Cs, context=None):
         """
         Funzione che restituisce l'euristica h per il contesto sp0ecificato sulla base dei vincoli non ancora soddisfatti
 
         Parametri:
             Cs (List): la lista dei vincoli rimanenti da soddisfare
+            context (Dict): il contesto corrente, necessario per il limite "packing"
 
         Returns:
             Int: L'euristica h per il contesto specificato
         """
 
+        if self.lowerBound == "packing" and context is not None:
+            return self.hPacking(Cs, context)
+
         h = 0
         for c in Cs:
             if self.kb.getAreaSeverity(c) == 2:
@@ -111,9 +523,10 @@ class PatrolArrangement:
                 nearAreas = self.kb.getAreasByDistance(area, 1)
                 for nearArea in nearAreas:
                     if nearArea in Vs:
-                        if self.kb.getAreaSeverity(nearArea) == 0:
+                        severity = self.kb.getAreaSeverity(nearArea)
+                        if severity == 0:
                             return nearArea
-                        elif self.kb.getAreaSeverity(nearArea) == 1:
+                        elif severity == 1:
                             bestArea = nearArea
         return bestArea
 
@@ -130,6 +543,9 @@ class PatrolArrangement:
             List: La lista delle aree valutabili
         """
 
+        if self.incremental:
+            return self.evaluableAreasIncremental(CCs, context)
+
         keys = list(context.keys())
         areas = self.kb.getAreasList()
 
@@ -140,6 +556,254 @@ class PatrolArrangement:
             if area not in keys:
                 self.kb.removeAreaPatrol(area)
         
-        can_eval = list(dict.fromkeys(self.kb.evaluableAreas(CCs)))
+        can_eval = self.kb.evaluableAreas(CCs)
+
+        return can_eval
+
+
+    def hPacking(self, Cs, context):
+        """
+        Funzione che restituisce un limite inferiore del costo ancora da aggiungere al contesto.
+        Ogni vincolo rimanente senza aree pattugliate nel vicinato richiede una nuova pattuglia tra le sue aree non assegnate (candidate).
+        Vengono scelti in modo greedy, partendo da quelli con meno candidate, vincoli con candidate disgiunte: richiedono pattuglie
+        distinte, quindi la somma del peso minimo delle loro candidate non supera il costo di nessun completamento del contesto
+
+        Parametri:
+            Cs (List): la lista dei vincoli rimanenti da soddisfare
+            context (Dict): il contesto corrente
+
+        Returns:
+            Float: Il limite inferiore per il contesto specificato
+        """
+
+        candidatesList = []
+        for c in Cs:
+            ball = self.balls[c]
+            if any(context.get(area) for area in ball):
+                continue
+            candidates = [area for area in ball if area not in context]
+            if not candidates:
+                return float('inf')
+            candidatesList.append(candidates)
+        candidatesList.sort(key=len)
+
+        used = set()
+        h = 0
+        for candidates in candidatesList:
+            if used.isdisjoint(candidates):
+                used.update(candidates)
+                h += min(self.areaWeights[area] for area in candidates)
+        return h
+
+
+    def initNeighbourhoods(self, areaList):
+        """
+        Metodo che calcola per ogni area il suo vicinato, cioè le aree entro la distanza 2 - gravità corretta (in cui deve esserci
+        una pattuglia perché l'area sia sicura), e il peso di una pattuglia assegnata all'area
+
+        Parametri:
+            areaList (List): la lista delle aree del problema
+        """
+
+        self.balls = {}
+        self.areaWeights = {}
+        for area in areaList:
+            radius = 2 - self.kb.getAreaAdjustedSeverity(area)
+            self.balls[area] = self.kb.getAreasWithinDistance(area, radius)
+            self.areaWeights[area] = 3 - self.kb.getAreaSeverity(area)
+
+
+    def initPatrolState(self, areaList):
+        """
+        Metodo che prepara lo stato usato dalla modalità incrementale: rimuove i fatti patrolArea presenti nella knowledge base,
+        calcola per ogni area le aree nel cui vicinato si trova e l'insieme iniziale delle aree valutabili
+
+        Parametri:
+            areaList (List): la lista delle aree del problema
+        """
+
+        self.kb.clearPatrols()
+        self.dependents = {area: [] for area in areaList}
+        for area in areaList:
+            for nearArea in self.balls[area]:
+                self.dependents[nearArea].append(area)
+        self.considerable = set(self.kb.evaluableAreas(areaList))
+
+
+    def evaluableAreasIncremental(self, CCs, context):
+        """
+        Funzione che restituisce la lista delle aree valutabili aggiornando solo i fatti patrolArea delle variabili
+        assegnate o rimosse rispetto al nodo precedente. La valutabilità viene ricontrollata solo per le aree che hanno
+        nel proprio vicinato una delle variabili modificate
+
+        Parametri:
+            CCs (List): la lista dei vincoli
+            context (Dict): il contesto corrente
+
+        Returns:
+            List: La lista delle aree valutabili
+        """
+
+        patrolState = self.kb.patrolState
+        changed = []
+        for area, patrol in context.items():
+            if patrolState.get(area) != patrol:
+                self.kb.setAreaPatrol(area, patrol)
+                changed.append(area)
+        for area in [area for area in patrolState if area not in context]:
+            self.kb.removeAreaPatrol(area)
+            changed.append(area)
+
+        toCheck = set()
+        for area in changed:
+            toCheck.update(self.dependents[area])
+        if toCheck:
+            considerable = self.kb.getConsiderableAreas(toCheck)
+            self.considerable -= toCheck
+            self.considerable |= considerable
+
+        return [c for c in CCs if c in self.considerable]
+
+
+    def initMasks(self, areaList):
+        """
+        Metodo che prepara i dati usati dalla ricerca con contesto a insiemi di bit: a ogni area è associato l'indice che ha in areaList,
+        sia come variabile che come vincolo
+
+        Parametri:
+            areaList (List): la lista delle aree del problema
+        """
+
+        index = {area: i for i, area in enumerate(areaList)}
+        self.weights = []
+        self.ballMasks = []
+        self.nearMasks = []
+        self.severityMasks = [0, 0, 0]
+        for i, area in enumerate(areaList):
+            severity = self.kb.getAreaSeverity(area)
+            self.weights.append(self.areaWeights[area])
+            self.severityMasks[severity] |= 1 << i
+            self.ballMasks.append(sum(1 << index[a] for a in self.balls[area]))
+            self.nearMasks.append(sum(1 << index[a] for a in self.kb.getAreasByDistance(area, 1)))
+
+
+    def costMask(self, assigned, true, can_eval):
+        """
+        Equivalente di cost per la ricerca con contesto a insiemi di bit.
+        Un vincolo valutabile è soddisfatto se nel suo vicinato c'è almeno un'area pattugliata
+
+        Parametri:
+            assigned (Int): l'insieme delle aree assegnate
+            true (Int): l'insieme delle aree pattugliate
+            can_eval (Int): l'insieme dei vincoli valutabili
+
+        Returns:
+            Float: Il costo del contesto specificato
+        """
+
+        for c in iterBits(can_eval):
+            if not self.ballMasks[c] & true:
+                return float('inf')
+        return sum(self.weights[area] for area in iterBits(true))
+
+
+    def hMask(self, rem_Cs, assigned, true):
+        """
+        Equivalente di h per la ricerca con contesto a insiemi di bit
+
+        Parametri:
+            rem_Cs (Int): l'insieme dei vincoli rimanenti da soddisfare
+            assigned (Int): l'insieme delle aree assegnate
+            true (Int): l'insieme delle aree pattugliate
+
+        Returns:
+            Int: L'euristica h per il contesto specificato
+        """
+
+        if self.lowerBound == "packing":
+            return self.hPackingMask(rem_Cs, assigned, true)
+        return (rem_Cs & self.severityMasks[2]).bit_count()
+
+
+    def hPackingMask(self, rem_Cs, assigned, true):
+        """
+        Equivalente di hPacking per la ricerca con contesto a insiemi di bit
+
+        Parametri:
+            rem_Cs (Int): l'insieme dei vincoli rimanenti da soddisfare
+            assigned (Int): l'insieme delle aree assegnate
+            true (Int): l'insieme delle aree pattugliate
+
+        Returns:
+            Float: Il limite inferiore per il contesto specificato
+        """
+
+        candidatesList = []
+        for c in iterBits(rem_Cs):
+            ball = self.ballMasks[c]
+            if ball & true:
+                continue
+            candidates = ball & ~assigned
+            if not candidates:
+                return float('inf')
+            candidatesList.append(candidates)
+        candidatesList.sort(key=int.bit_count)
+
+        used = 0
+        h = 0
+        for candidates in candidatesList:
+            if not candidates & used:
+                used |= candidates
+                if candidates & self.severityMasks[2]:
+                    h += 1
+                elif candidates & self.severityMasks[1]:
+                    h += 2
+                else:
+                    h += 3
+        return h
+
+
+    def selectVariableMask(self, CVs, assigned, true):
+        """
+        Equivalente di selectVariable per la ricerca con contesto a insiemi di bit.
+        Vengono preferite le variabili vicine ad aree pattugliate e con gravità minore
+
+        Parametri:
+            CVs (Int): l'insieme delle variabili rimanenti
+            assigned (Int): l'insieme delle aree assegnate
+            true (Int): l'insieme delle aree pattugliate
+
+        Returns:
+            Int: L'indice della variabile da assegnare
+        """
+
+        candidates = 0
+        for area in iterBits(true):
+            candidates |= self.nearMasks[area]
+        candidates &= CVs
+        for severity in (0, 1):
+            if candidates & self.severityMasks[severity]:
+                candidates &= self.severityMasks[severity]
+                return (candidates & -candidates).bit_length() - 1
+        return (CVs & -CVs).bit_length() - 1
+
+
+    def evaluableAreasMask(self, CCs, assigned, true):
+        """
+        Equivalente di evaluableAreas per la ricerca con contesto a insiemi di bit.
+        Un vincolo è valutabile quando tutte le aree del suo vicinato sono assegnate
+
+        Parametri:
+            CCs (Int): l'insieme dei vincoli
+            assigned (Int): l'insieme delle aree assegnate
+            true (Int): l'insieme delle aree pattugliate
+
+        Returns:
+            Int: L'insieme dei vincoli valutabili
+        """
 
+        can_eval = 0
+        for c in iterBits(CCs):
+            if not self.ballMasks[c] & ~assigned:
+                can_eval |= 1 << c
         return can_eval
\ No newline at end of file
@@ -0,0 +1,120 @@
+from collections import OrderedDict
+from util import writeJson
+import hashlib
+import json
+import os
+
+
+class SolutionCache:
+    """
+    Classe che memorizza le disposizioni ottime delle pattuglie già calcolate.
+    La disposizione ottima dipende solo dalla gravità delle aree, dalle loro vicinanze e dimensioni e dalla versione del risolutore,
+    quindi fasce orarie con lo stesso vettore di gravità possono riusare la stessa soluzione.
+    Le soluzioni sono tenute in memoria con politica LRU e, se specificata una cartella, salvate anche su disco
+
+    Attributi:
+        maxSize (Int): il numero massimo di soluzioni tenute in memoria
+        path (String): la cartella in cui salvare le soluzioni su disco. Se None le soluzioni restano solo in memoria
+    """
+
+    __all__ = ['makeKey', 'get', 'put']
+
+
+    def __init__(self, maxSize=1024, path=None):
+        """
+        Costruttore della classe
+
+        Parametri:
+            maxSize (Int): il numero massimo di soluzioni tenute in memoria
+            path (String): la cartella in cui salvare le soluzioni su disco. Se None le soluzioni restano solo in memoria
+        """
+
+        self.maxSize = maxSize
+        self.path = path
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and not os.path.exists(path):
+            os.makedirs(path)
+
+
+    def makeKey(self, severities, nearAreas, sizes, version):
+        """
+        Funzione che calcola la chiave di una soluzione
+
+        Parametri:
+            severities (Dict): la gravità di ogni area
+            nearAreas (Dict): le aree vicine di ogni area
+            sizes (Dict): la dimensione di ogni area
+            version (String): la versione del risolutore
+
+        Returns:
+            String: l'hash che identifica il problema
+        """
+
+        data = {
+            'severities': sorted(severities.items()),
+            'nearAreas': sorted((area, sorted(near)) for area, near in nearAreas.items()),
+            'sizes': sorted(sizes.items()),
+            'version': version
+        }
+        return hashlib.sha256(json.dumps(data).encode()).hexdigest()
+
+
+    def get(self, key):
+        """
+        Funzione che restituisce la soluzione memorizzata con la chiave specificata, cercandola prima in memoria e poi su disco
+
+        Parametri:
+            key (String): la chiave della soluzione
+
+        Returns:
+            Dict: la disposizione delle pattuglie, None se non presente
+        """
+
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return dict(self.memory[key])
+
+        if self.path is not None:
+            filePath = os.path.join(self.path, f"{key}.json")
+            if os.path.exists(filePath):
+                with open(filePath, 'r') as file:
+                    arrangement = {area: patrol for area, patrol in json.load(file)}
+                self.remember(key, arrangement)
+                self.hits += 1
+                return dict(arrangement)
+
+        self.misses += 1
+        return None
+
+
+    def put(self, key, arrangement):
+        """
+        Metodo che memorizza una soluzione in memoria e, se specificata la cartella, su disco
+
+        Parametri:
+            key (String): la chiave della soluzione
+            arrangement (Dict): la disposizione delle pattuglie
+        """
+
+        self.remember(key, dict(arrangement))
+        if self.path is not None:
+            filePath = os.path.join(self.path, f"{key}.json")
+            writeJson(filePath, list(arrangement.items()))
+
+
+    def remember(self, key, arrangement):
+        """
+        Metodo che aggiunge una soluzione alla memoria, rimuovendo la meno usata di recente se viene superata la dimensione massima
+
+        Parametri:
+            key (String): la chiave della soluzione
+            arrangement (Dict): la disposizione delle pattuglie
+        """
+
+        self.memory[key] = arrangement
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxSize:
+            self.memory.popitem(last=False)
@@ -1,3 +1,6 @@
+import numpy as np
+import tempfile
+import json
 import os
 
 
@@ -30,6 +33,90 @@ def removeElements(lst1, lst2):
     return [elem for elem in lst1 if elem not in lst2]
 
 
+def iterBits(mask):
+    """
+    Funzione che restituisce gli indici dei bit impostati a 1 in un intero, dal meno significativo
+
+    Parametri:
+        mask (Int): l'intero usato come insieme di bit
+
+    Returns:
+        Generator: gli indici dei bit impostati a 1
+    """
+
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def hopDistanceMatrix(adjacency):
+    """
+    Funzione che calcola la distanza (numero minimo di passaggi) tra tutte le coppie di nodi di un grafo, con una visita in ampiezza
+    eseguita contemporaneamente da tutti i nodi
+
+    Parametri:
+        adjacency (ndarray): la matrice di adiacenza booleana del grafo (n x n)
+
+    Returns:
+        ndarray: la matrice delle distanze (n x n), con -1 per le coppie non collegate
+    """
+
+    n = adjacency.shape[0]
+    adjacency = adjacency.astype(np.int32)
+    distances = np.full((n, n), -1, dtype=np.int32)
+    reached = np.eye(n, dtype=bool)
+    frontier = reached.copy()
+    distances[reached] = 0
+    d = 0
+    while frontier.any():
+        d += 1
+        frontier = (frontier.astype(np.int32) @ adjacency > 0) & ~reached
+        distances[frontier] = d
+        reached |= frontier
+    return distances
+
+
+def atomicWrite(path, writer, suffix=".tmp"):
+    """
+    Funzione che scrive un file in modo atomico: writer scrive su un file temporaneo con nome univoco nella stessa cartella,
+    che sostituisce il file di destinazione solo a scrittura completata. Chi legge trova quindi il file vecchio o quello nuovo completo
+    e più processi che scrivono lo stesso file non si sovrascrivono i file temporanei
+
+    Parametri:
+        path (String): il file da scrivere
+        writer (Function): la funzione writer(tmpPath) che scrive il contenuto nel file temporaneo
+        suffix (String): l'estensione del file temporaneo (ad esempio ".npy" per np.save, che altrimenti la aggiunge)
+    """
+
+    fd, tmpPath = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f"{os.path.basename(path)}.", suffix=suffix)
+    os.close(fd)
+    try:
+        writer(tmpPath)
+        os.replace(tmpPath, path)
+    except BaseException:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+        raise
+
+
+def writeJson(path, data, indent=None):
+    """
+    Funzione che salva un oggetto in un file json in modo atomico
+
+    Parametri:
+        path (String): il file da scrivere
+        data (Object): l'oggetto da salvare
+        indent (Int): l'indentazione del file json, None per scriverlo su una sola riga
+    """
+
+    def write(tmpPath):
+        with open(tmpPath, 'w') as file:
+            json.dump(data, file, indent=indent)
+
+    atomicWrite(path, write)
+
+
 def printSolution(sol):
     """
     Metodo che stampa la soluzione del problema di CSP. Se la soluzione è None, stampa "No solution found", altrimenti stampa le aree da pattugliare
@@ -0,0 +1,27 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# La verifica richiede pyswip e SWI-Prolog: senza di essi i test vengono saltati
+try:
+    from pyswip import Prolog
+    Prolog()
+except Exception as error:
+    pytest.skip(f"SWI-Prolog non disponibile: {error}", allow_module_level=True)
+
+from cleanDataset import cleanChicagoAreas
+from kbParity import runParity
+
+
+@pytest.mark.parametrize("compiled", [True, False])
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_parity(compiled, seed):
+    """
+    Test che confronta la base di conoscenza in prolog (compilata e non) con quella con array NumPy su gravità casuali
+    """
+
+    errors = runParity(cleanChicagoAreas(), None, slots=0, severities=3, steps=50, seed=seed, compiled=compiled)
+    assert errors == []